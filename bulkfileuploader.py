@@ -5,18 +5,16 @@ The script also has an option to list direct media links, which is useful when e
 __author__ = 'Simon Robinson'
 __copyright__ = 'Copyright (c) 2024 Simon Robinson'
 __license__ = 'Apache 2.0'
-__version__ = '2024-04-16'  # ISO 8601 (YYYY-MM-DD)
+__version__ = '2026-10-15'  # ISO 8601 (YYYY-MM-DD)
 
 import argparse
-import json
+import io
 import mimetypes
 import os
 import re
 import sys
 import uuid
 
-import requests
-
 from canvashelpers import Args, Utils
 
 
@@ -49,18 +47,28 @@ def get_args():
     parser.add_argument('--randomise-names', action='store_true',
                         help='If set, the script will rename the uploaded files with a random UUID (keeping the same '
                              'file extension)')
+    parser.add_argument('--overwrite-existing', action='store_true',
+                        help='By default, files whose names match a file that is already present in the Canvas folder '
+                             'are skipped. Set this option to upload (and overwrite) these files instead. This option '
+                             'has no effect when `--randomise-names` is set')
     parser.add_argument('--get-media-ids', action='store_true',
                         help='When uploading media, Canvas converts files into its own formats before providing a '
                              'media ID (which is needed when using files in, e.g., Pages). This option instructs the '
                              'script to simply list all media IDs in a given folder (then exit). The `--filename-'
                              'pattern` option can be used if needed to filter the output')
+    parser.add_argument('--parallel-uploads', type=Args.parallel_requests, default=4,
+                        help='The number of files to upload simultaneously (at most %d). Default: 4' %
+                             Utils.CONNECTION_POOL_SIZE)
     parser.add_argument('--dry-run', action='store_true',
                         help='Preview the script\'s actions without actually uploading any files. Highly recommended!')
     return parser.parse_args()
 
 
 args = Args.interactive(get_args)
+FILE_MATCHER = re.compile(args.filename_pattern, flags=re.IGNORECASE)
 COURSE_URL = Utils.course_url_to_api(args.url[0]).split('/files')[0]
+API_ROOT = COURSE_URL.split('/courses')[0]
+CANVAS_ROOT = args.url[0].split('/courses')[0]
 try:
     COURSE_ROOT, FOLDER_ROOT = args.url[0].split('/files/folder/')
 except ValueError:
@@ -68,34 +76,39 @@ except ValueError:
     FOLDER_ROOT = ''
 
 # first we need to locate the remote folder
-folder_path_response = requests.get('%s/folders/by_path/%s' % (COURSE_URL, FOLDER_ROOT),
-                                    headers=Utils.canvas_api_headers())
+folder_path_response = Utils.SESSION.get('%s/folders/by_path/%s' % (COURSE_URL, FOLDER_ROOT))
 if folder_path_response.status_code != 200:
     print('ERROR: unable to find folder', FOLDER_ROOT)
     sys.exit()
 
 selected_folder = folder_path_response.json()[-1]  # this API provides the requested folder last
-selected_folder_api_path = '%s/folders/%s/files' % (COURSE_URL.split('/courses')[0], selected_folder['id'])
+selected_folder_api_path = '%s/folders/%s/files' % (API_ROOT, selected_folder['id'])
 print('Found requested Canvas folder:', selected_folder)
 
 # getting media IDs is a single-purpose option
 if args.get_media_ids:
     print('\nMedia ID mode: searching for existing media in', FOLDER_ROOT if FOLDER_ROOT else '[root folder]')
-    existing_files = Utils.canvas_multi_page_request(selected_folder_api_path, type_hint='files')
-    if not existing_files:
+    print('Filtering files against pattern', args.filename_pattern)
+    file_count = 0
+    match_count = 0
+    for folder_page in Utils.canvas_multi_page_iterator(selected_folder_api_path, type_hint='files'):
+        if folder_page is None:
+            print('ERROR: unable to retrieve the contents of the given folder; aborting')
+            sys.exit()
+
+        # note: the folder files API only returns files that are directly within the requested folder
+        file_count += len(folder_page)
+        matching_files = ['\t %s : %s/files/%s/file_preview : %s' % (
+            f['display_name'], COURSE_ROOT, f['id'], f['media_entry_id'])
+                          for f in folder_page if FILE_MATCHER.match(f['display_name'])]
+        if matching_files:
+            print('\n'.join(matching_files))
+            match_count += len(matching_files)
+
+    if file_count == 0:
         print('No files found in the given folder; nothing to do')
         sys.exit()
-
-    folder_json = json.loads(existing_files)
-    file_matcher = re.compile(args.filename_pattern, flags=re.IGNORECASE)
-    match_count = 0
-    print('Found', len(folder_json), 'files total; filtering against pattern', args.filename_pattern)
-    for file in folder_json:
-        if file['folder_id'] == selected_folder['id'] and file_matcher.match(file['display_name']):
-            print('\t', file['display_name'], ':', '%s/files/%s/file_preview' % (COURSE_ROOT, file['id']), ':',
-                  file['media_entry_id'])
-            match_count += 1
-    print('Found', match_count, 'matching files; exiting')
+    print('Found', match_count, 'matching files (out of', file_count, 'total); exiting')
     sys.exit()
 
 # in normal mode, the next step is to filter the list of local files
@@ -103,18 +116,38 @@ if not os.path.exists(args.working_directory):
     print('ERROR: unable to find working directory', args.working_directory)
     sys.exit()
 
-selected_files = [f for f in os.listdir(args.working_directory) if
-                  re.match(args.filename_pattern, f, flags=re.IGNORECASE)]
-print('Found', len(selected_files), 'files to upload:', selected_files)
+# note: subdirectories are skipped, as their contents are not uploaded
+with os.scandir(args.working_directory) as directory_entries:
+    selected_files = [e for e in directory_entries if e.is_file() and FILE_MATCHER.match(e.name)]
+
+# re-running the script should not upload files again (Canvas overwrites existing files that have the same name)
+if not args.randomise_names and not args.overwrite_existing:
+    existing_files = Utils.canvas_multi_page_request(selected_folder_api_path, type_hint='existing files')
+    if existing_files is None:
+        print('WARNING: unable to retrieve the existing contents of the Canvas folder; not skipping any files')
+    else:
+        existing_file_names = {f['display_name'] for f in existing_files}
+        skipped_files = [f.name for f in selected_files if f.name in existing_file_names]
+        if skipped_files:
+            print('Skipping', len(skipped_files), 'files that are already present in the Canvas folder (use',
+                  '`--overwrite-existing` to replace them):', skipped_files)
+            selected_files = [f for f in selected_files if f.name not in existing_file_names]
+print('Found', len(selected_files), 'files to upload:', [f.name for f in selected_files])
+
 
 # finally, we upload and, if requested, set the licence type and publish the files
-for file in selected_files:
-    file_path = os.path.join(args.working_directory, file)
+def upload_file(file_entry):
+    """Upload a single file (from its directory entry), returning its progress messages and Canvas ID (if uploaded)"""
+    output = io.StringIO()
+    file = file_entry.name
+    file_path = file_entry.path
     file_mime_type = args.file_mime_type or mimetypes.guess_type(file_path)[0]
-    _, file_extension = os.path.splitext(file_path)
-    file_name = '%s%s' % (uuid.uuid4().hex, file_extension) if args.randomise_names else file
+    file_name = file
+    if args.randomise_names:
+        _, file_extension = os.path.splitext(file)
+        file_name = '%s%s' % (uuid.uuid4().hex, file_extension)
     print('Uploading', file, 'with MIME type', file_mime_type, 'and random name' if args.randomise_names else '',
-          file_name)
+          file_name, file=output)
 
     uploaded_file_id = None
     if not args.dry_run:
@@ -123,46 +156,57 @@ for file in selected_files:
             'name': file_name,
             'content_type': file_mime_type
         }
-        file_upload_url_response = requests.post(selected_folder_api_path, data=submission_form_data,
-                                                 headers=Utils.canvas_api_headers())
+        file_upload_url_response = Utils.SESSION.post(selected_folder_api_path, data=submission_form_data)
         if file_upload_url_response.status_code != 200:
-            print('\tERROR: unable to retrieve file upload URL; skipping')
-            continue
+            print('\tERROR: unable to retrieve file upload URL; skipping', file=output)
+            return output.getvalue(), None
 
         file_upload_url_json = file_upload_url_response.json()
-        print('\tUploading file to', file_upload_url_json['upload_url'].split('?')[0], '[truncated]')
+        print('\tUploading file to', file_upload_url_json['upload_url'].split('?')[0], '[truncated]', file=output)
 
-        files_data = {'file': (file_name, open(file_path, 'rb'))}
-        file_upload_response = requests.post(file_upload_url_json['upload_url'],
-                                             data=submission_form_data, files=files_data,
-                                             headers=Utils.canvas_api_headers())
+        with open(file_path, 'rb') as file_data:
+            files_data = {'file': (file_name, file_data, file_mime_type)}
+            file_upload_response = Utils.SESSION.post(file_upload_url_json['upload_url'], data=submission_form_data,
+                                                      files=files_data)
 
         if file_upload_response.status_code != 201:  # note: 201 Created
-            print('\tERROR: unable to upload file; skipping:', file_upload_response.text)
-            continue
+            print('\tERROR: unable to upload file; skipping:', file_upload_response.text, file=output)
+            return output.getvalue(), None
 
         file_upload_json = file_upload_response.json()
         uploaded_file_id = file_upload_json['id']
         print('\tSuccessfully saved file', file_upload_json['id'], 'at',
-              '%s%s' % (args.url[0].split('/courses')[0], file_upload_json['preview_url'].split('?')[0]))
+              '%s%s' % (CANVAS_ROOT, file_upload_json['preview_url'].split('?')[0]), file=output)
     else:
-        print('\tDRY RUN: skipping file upload step')
-
-    if args.license:
-        print('\tSetting file license type to', args.license, 'and publishing' if args.publish else '', end='... ')
-        if args.dry_run:
-            print('\n\tDRY RUN: skipping license configuration step')
-            continue
-
-        if uploaded_file_id:
-            license_configuration = {
-                'file_ids[]': uploaded_file_id,
-                'publish': 'false' if not args.publish else args.publish,
-                'usage_rights[use_justification]': args.license
-            }
-            license_update_response = requests.put('%s/usage_rights' % COURSE_URL, params=license_configuration,
-                                                   headers=Utils.canvas_api_headers())
-            if license_update_response.status_code != 200:
-                print('\n\tERROR: unable to set license; skipping:', license_update_response.text)
-                continue
+        print('\tDRY RUN: skipping file upload step', file=output)
+    return output.getvalue(), uploaded_file_id
+
+
+uploaded_file_ids = []
+mimetypes.init()  # load the MIME type database up-front rather than lazily (and potentially concurrently) on first use
+for upload_output, uploaded_file_id in Utils.map_concurrently(upload_file, selected_files,
+                                                              max_workers=args.parallel_uploads):
+    print(upload_output, end='')
+    if uploaded_file_id:
+        uploaded_file_ids.append(uploaded_file_id)
+
+# the usage rights API accepts multiple files, so the licence type is set for all uploaded files in a single request
+if args.license:
+    print('\nSetting license type to', args.license, 'and publishing' if args.publish else '', 'for',
+          len(selected_files) if args.dry_run else len(uploaded_file_ids), 'files', end='... ')
+    if args.dry_run:
+        print('\nDRY RUN: skipping license configuration step')
+    elif uploaded_file_ids:
+        license_configuration = {
+            'file_ids[]': uploaded_file_ids,
+            'publish': 'false' if not args.publish else args.publish,
+            'usage_rights[use_justification]': args.license
+        }
+        # sent as form data rather than URL parameters because the list of file IDs can be long
+        license_update_response = Utils.SESSION.put('%s/usage_rights' % COURSE_URL, data=license_configuration)
+        if license_update_response.status_code != 200:
+            print('\nERROR: unable to set license:', license_update_response.text)
+        else:
             print('success')
+    else:
+        print('\nNo files were uploaded successfully; skipping license configuration step')
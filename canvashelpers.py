@@ -3,26 +3,57 @@
 __author__ = 'Simon Robinson'
 __copyright__ = 'Copyright (c) 2024 Simon Robinson'
 __license__ = 'Apache 2.0'
-__version__ = '2024-04-05'  # ISO 8601 (YYYY-MM-DD)
+__version__ = '2026-10-15'  # ISO 8601 (YYYY-MM-DD)
 
+import argparse
+import collections
+import concurrent.futures
 import configparser
 import csv
+import io
+import itertools
 import json
 import os
 import re
 import sys
-import tempfile
+import time
+import urllib.parse
 
 import openpyxl
+import requests.adapters
 import requests.structures
+import urllib3.util
+
+try:
+    # noinspection PyPackageRequirements,PyUnresolvedReferences
+    import orjson  # optional: a faster JSON parser, which helps when handling large API responses
+
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+try:
+    # noinspection PyPackageRequirements,PyUnresolvedReferences
+    import requests_cache  # optional: on-disk caching of API responses (see `api_response_cache_seconds`)
+except ImportError:
+    requests_cache = None
 
 
 class Config:
-    FILE_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'canvashelpers.config')
+    # the configuration file location can be overridden (e.g., to switch between Canvas instances or accounts)
+    FILE_PATH = os.environ.get('CANVAS_HELPERS_CONFIG',
+                               os.path.join(os.path.dirname(os.path.realpath(__file__)), 'canvashelpers.config'))
+    SECTION_NAME = 'Canvas helpers configuration file'
 
     configparser = configparser.ConfigParser()
     configparser.read(FILE_PATH)
-    SETTINGS = configparser[configparser.sections()[0]]
+    if SECTION_NAME not in configparser:
+        # older (or edited) configuration files may use a different section name, so fall back to the first one found
+        SECTION_NAME = next(iter(configparser.sections()), None)
+        if not SECTION_NAME:
+            print('ERROR: unable to read configuration file', FILE_PATH, '- please make sure it exists and is valid')
+            sys.exit()
+    SETTINGS = dict(configparser[SECTION_NAME])  # a plain dict avoids repeated interpolation on access
 
     API_TOKEN = SETTINGS['canvas_api_token']  # all scripts need this token; only a subset need the full settings below
 
@@ -35,7 +66,74 @@ class Config:
         return Config.SETTINGS
 
 
+class RateLimitAdapter(requests.adapters.HTTPAdapter):
+    """Canvas limits API usage with a per-user quota that is reported in the `X-Rate-Limit-Remaining` header of each
+    response, and rejects requests with 403 Forbidden (rather than 429 Too Many Requests) when this is used up. This
+    adapter slows down requests when the quota is running low, and retries any that are rejected after a delay"""
+    LOW_QUOTA = 100  # the default quota is 700; requests typically cost 1-50 (more when sent simultaneously)
+    MAXIMUM_RETRIES = 5
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        for attempt in range(RateLimitAdapter.MAXIMUM_RETRIES):
+            if response.status_code != 403 or 'Rate Limit Exceeded' not in response.text:
+                break
+            response.close()  # release the rejected response's connection back to the pool before retrying
+            time.sleep(2 ** attempt)  # throttled requests are not processed at all, so are always safe to resend
+            response = super().send(request, **kwargs)
+
+        try:
+            remaining_quota = float(response.headers.get('X-Rate-Limit-Remaining', RateLimitAdapter.LOW_QUOTA))
+        except ValueError:
+            remaining_quota = RateLimitAdapter.LOW_QUOTA
+        if remaining_quota < RateLimitAdapter.LOW_QUOTA:
+            time.sleep((RateLimitAdapter.LOW_QUOTA - remaining_quota) / RateLimitAdapter.LOW_QUOTA)  # (at most 1s)
+        return response
+
+
 class Utils:
+    # API request headers do not change while a script is running, so are created just once
+    API_HEADERS = requests.structures.CaseInsensitiveDict({'accept': 'application/json',
+                                                           'authorization': 'Bearer %s' % Config.API_TOKEN})
+
+    # all API requests share a single session so that connections to Canvas (and its file upload hosts) are reused
+    # (if enabled in the configuration file and `requests-cache` is installed, GET responses are also cached on disk;
+    # cached responses that have an ETag or Last-Modified header are revalidated with a conditional request each time
+    # they are used, so Canvas only needs to send a new response body if the original has actually changed)
+    CACHE_SECONDS = int(Config.SETTINGS.get('api_response_cache_seconds', 0))
+    if CACHE_SECONDS > 0 and requests_cache:
+        SESSION = requests_cache.CachedSession(
+            cache_name=os.path.join(os.path.dirname(Config.FILE_PATH), 'canvashelpers_cache'), backend='sqlite',
+            expire_after=CACHE_SECONDS, allowable_methods=['GET'], always_revalidate=True)
+    else:
+        if CACHE_SECONDS > 0:
+            print('WARNING: API response caching is enabled in', Config.FILE_PATH, 'but the `requests-cache` module is',
+                  'not installed; continuing without caching')
+        SESSION = requests.Session()
+    SESSION.headers.update(API_HEADERS)
+
+    # temporary server errors and rate limiting are retried automatically, with an increasing delay between attempts
+    # (note: only idempotent requests are retried - i.e., not POST); if all retries fail the final response is returned
+    # - Canvas's own rate limiting is handled separately (see RateLimitAdapter) because it uses a different status code
+    RETRY_STRATEGY = urllib3.util.Retry(total=5, backoff_factor=0.5, status_forcelist=[429, 502, 503, 504],
+                                        raise_on_status=False)
+
+    # requests are sent in parallel by thread pools of (at most) this size, which are never nested more than two deep
+    # (e.g., each group's members are requested at the same time, and each of these may be a multi-page request whose
+    # pages are also requested at the same time), so the connection pool is sized for this worst case; otherwise, any
+    # connections beyond its limit would be discarded (and then re-established) rather than reused. Script options that
+    # set a number of parallel requests (which are not nested) are limited to the pool size (see Args.parallel_requests)
+    MAX_CONCURRENT_REQUESTS = 8
+    CONNECTION_POOL_SIZE = MAX_CONCURRENT_REQUESTS ** 2
+    SESSION.mount('https://', RateLimitAdapter(pool_connections=4, pool_maxsize=CONNECTION_POOL_SIZE,
+                                               max_retries=RETRY_STRATEGY))
+
+    # Login IDs that have had to be requested individually; see Utils.get_canvas_user_login_id
+    LOGIN_ID_CACHE = {}
+
+    # splits text into its numeric and non-numeric parts; see Utils.ordered_strings
+    NUMBER_SPLITTER = re.compile(r'(\d+)').split
+
     @staticmethod
     def course_url_to_api(url):
         return url.rstrip('/').replace('/courses', '/api/v1/courses')
@@ -49,62 +147,161 @@ class Utils:
 
     @staticmethod
     def get_course_id(course_url):
-        return int(course_url.split('courses/')[-1].split('/')[0])
+        return int(course_url.rpartition('courses/')[2].partition('/')[0])
 
     @staticmethod
     def get_assignment_id(assignment_url):
-        return int(assignment_url.rstrip('/').split('/')[-1])
+        return int(assignment_url.rstrip('/').rpartition('/')[2])
 
     @staticmethod
     def get_user_details(api_root, user_id='self'):
-        user_details_response = requests.get('%s/users/%s/' % (api_root, user_id), headers=Utils.canvas_api_headers())
+        user_details_response = Utils.SESSION.get('%s/users/%s/' % (api_root, user_id))
         if user_details_response.status_code != 200:
             return user_id, 'UNKNOWN NAME'
-        user_details_json = user_details_response.json()
+        user_details_json = Utils.response_json(user_details_response)
         return user_details_json['id'], user_details_json['name']
 
     @staticmethod
     def ordered_strings(text):
-        # used to sort a list of numbers and/or names in a more natural order
-        return [int(c) if c.isdigit() else c for c in re.split(r'(\d+)', text)]
+        # used to sort a list of numbers and/or names in a more natural order - splitting on a captured group always
+        # alternates text and numbers (starting with text, which may be empty), so numbers are at the odd indices
+        parts = Utils.NUMBER_SPLITTER(text)
+        parts[1::2] = map(int, parts[1::2])
+        return parts
+
+    @staticmethod
+    def response_json(response):
+        # parse directly from the raw response bytes (rather than via response.text), using orjson if available
+        return json_loads(response.content)
 
     @staticmethod
     def canvas_api_headers():
-        submission_list_headers = requests.structures.CaseInsensitiveDict()
-        submission_list_headers['accept'] = 'application/json'
-        submission_list_headers['authorization'] = 'Bearer %s' % Config.API_TOKEN
-        return submission_list_headers
+        # note: API requests should normally use Utils.SESSION (which already includes these headers) instead; this
+        # shared (i.e., built only once) object is provided for any requests that cannot, and must not be modified
+        return Utils.API_HEADERS
 
     @staticmethod
-    def canvas_multi_page_request(current_request_url, params=None, type_hint='API'):
-        """Retrieve a full (potentially multi-page) response from the Canvas API. If the initial response refers to
-        subsequent pages of results, these are loaded and concatenated automatically. For (slightly) more specific
-        progress/error messages, set type_hint to a string describing the API call that is being made """
+    def canvas_multi_page_iterator(current_request_url, params=None, type_hint='API'):
+        """A generator that retrieves a (potentially multi-page) response from the Canvas API one page at a time, so
+        that only a single page of results needs to be held in memory. Each page is yielded as a list of its parsed
+        JSON items; if a page cannot be loaded then None is yielded and iteration stops. When Canvas reports the total
+        number of pages, several of the remaining pages are requested at the same time (but are still yielded in order),
+        so a small number of further pages may also be held while waiting to be yielded. For (slightly) more specific
+        progress/error messages, set type_hint to a string describing the API call that is being made"""
         if not params:
             params = {}
         params['per_page'] = 100
-        response = '[]'
-        while True:
-            print('Requesting', type_hint, 'page:', current_request_url)
-            current_response = requests.get(current_request_url, params=params, headers=Utils.canvas_api_headers())
-            if current_response.status_code != 200:
-                print('ERROR: unable to load complete', type_hint, 'response - status code',
-                      current_response.status_code)
+
+        def get_page(page_url, page_params=None, show_progress=True):
+            if show_progress:
+                print('Requesting', type_hint, 'page:', page_url)
+            page_response = Utils.SESSION.get(page_url, params=page_params)
+            if page_response.status_code != 200:
+                print('ERROR: unable to load complete', type_hint, 'response - status code', page_response.status_code)
                 return None
+            return page_response
+
+        # pagination links already include the original request's parameters, so these only need to be sent once
+        current_response = get_page(current_request_url, page_params=params)
+        while True:
+            if current_response is None:
+                yield None
+                return
 
-            response = response[:-1] + ',' + current_response.text[1:]
+            yield Utils.response_json(current_response)
 
-            # see: https://canvas.instructure.com/doc/api/file.pagination.html
-            page_links = current_response.headers['Link'] if 'Link' in current_response.headers else ''
-            next_page_match = re.search(r',\s*<(?P<next>.*?)>;\s*rel="next"', page_links)
-            if next_page_match:
-                current_request_url = next_page_match.group('next')
-            else:
-                return '[' + response[2:]
+            # see: https://canvas.instructure.com/doc/api/file.pagination.html (requests parses the `Link` header)
+            next_page = current_response.links.get('next')
+            if not next_page:
+                return
+
+            remaining_page_urls = Utils.get_remaining_page_urls(next_page, current_response.links.get('last'))
+            if not remaining_page_urls:
+                current_response = get_page(next_page['url'])  # no page count available; continue one page at a time
+                continue
+
+            # (a single progress message is used because the order in which simultaneous requests start is not fixed)
+            print('Requesting', len(remaining_page_urls), 'further', type_hint, 'pages:', next_page['url'], '[and',
+                  'subsequent pages]')
+            # only a limited number of pages are requested in advance, and a new request is started as each page is
+            # yielded; any that are still queued when iteration ends (or fails) are cancelled rather than downloaded
+            remaining_page_urls = iter(remaining_page_urls)
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=Utils.MAX_CONCURRENT_REQUESTS)
+            pending_pages = collections.deque()
+            try:
+                pending_pages.extend(executor.submit(get_page, url, show_progress=False)
+                                     for url in itertools.islice(remaining_page_urls, Utils.MAX_CONCURRENT_REQUESTS))
+                while pending_pages:
+                    page_response = pending_pages.popleft().result()
+                    if page_response is None:
+                        yield None
+                        return
+                    next_page_url = next(remaining_page_urls, None)
+                    if next_page_url:
+                        pending_pages.append(executor.submit(get_page, next_page_url, show_progress=False))
+                    yield Utils.response_json(page_response)
+            finally:
+                for pending_page in pending_pages:
+                    pending_page.cancel()  # (rather than `shutdown(cancel_futures=True)`, which requires Python 3.9+)
+                executor.shutdown()
+            return
+
+    @staticmethod
+    def get_remaining_page_urls(next_page, last_page):
+        """Canvas only provides the total number of pages for some API calls (and for others uses opaque bookmarks
+        rather than page numbers). Where the `next` and `last` pagination links are both numbered, returns a list of the
+        URLs of all pages from `next` to `last` (inclusive); otherwise returns None"""
+        if not last_page:
+            return None
+        next_url = urllib.parse.urlsplit(next_page['url'])
+        next_query = urllib.parse.parse_qsl(next_url.query, keep_blank_values=True)
+        next_number = dict(next_query).get('page', '')
+        last_number = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(last_page['url']).query)).get('page', '')
+        if not (next_number.isdigit() and last_number.isdigit()):
+            return None
+
+        page_urls = []
+        for page_number in range(int(next_number), int(last_number) + 1):
+            page_query = [(key, str(page_number) if key == 'page' else value) for key, value in next_query]
+            page_urls.append(urllib.parse.urlunsplit(next_url._replace(query=urllib.parse.urlencode(page_query))))
+        return page_urls
+
+    @staticmethod
+    def run_concurrently(*functions):
+        """Run several independent functions (typically API requests) at the same time, returning a list of their
+        results in the order the functions were given. Functions must not take any arguments - use a lambda to wrap
+        calls that need parameters"""
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(functions)) as executor:
+            futures = [executor.submit(function) for function in functions]
+            return [future.result() for future in futures]
+
+    @staticmethod
+    def map_concurrently(function, items, max_workers=None):
+        """A generator that calls `function` on each of `items` (typically to make an API request for each one), several
+        at the same time, and yields the results in the original order of `items`. This suits tasks that do not depend
+        on each other. Functions that report progress should return their messages rather than printing them, so that
+        the output of items that are processed simultaneously is not interleaved, and can then be printed in order as
+        results are yielded. By default, Utils.MAX_CONCURRENT_REQUESTS calls are made at once"""
+        max_workers = max_workers or Utils.MAX_CONCURRENT_REQUESTS
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            yield from executor.map(function, items)
+
+    @staticmethod
+    def canvas_multi_page_request(current_request_url, params=None, type_hint='API'):
+        """Retrieve a full (potentially multi-page) response from the Canvas API. If the initial response refers to
+        subsequent pages of results, these are loaded and combined automatically. Returns a list of the parsed JSON
+        items from all pages, or None on error. For (slightly) more specific progress/error messages, set type_hint to
+        a string describing the API call that is being made """
+        response = []
+        for page in Utils.canvas_multi_page_iterator(current_request_url, params=params, type_hint=type_hint):
+            if page is None:
+                return None
+            response.extend(page)
+        return response
 
     @staticmethod
     def get_course_users(course_url, includes=None, enrolment_types=None):
-        """Get a list of users in a course, returning a string that can be parsed as JSON. This function is simply
+        """Get a list of users in a course, returning a list of parsed JSON objects. This function is simply
         a wrapper around Utils.canvas_multi_page_request, but is kept to separate the API parameter complexity from
         the scripts that use this method"""
         params = {'enrollment_type[]': ['student'] if not enrolment_types else enrolment_types}
@@ -148,8 +345,7 @@ class Utils:
 
         csv_headers = None
         api_url = Utils.course_url_to_api(course_group_tab_url).split('/courses')[0]
-        group_set_response = requests.get('%s/group_categories/%d/export' % (api_url, group_set_id),
-                                          headers=Utils.canvas_api_headers())
+        group_set_response = Utils.SESSION.get('%s/group_categories/%d/export' % (api_url, group_set_id))
         if group_set_response.status_code != 200:
             if group_set_response.status_code == 401:
                 # archived courses don't support this method, so we use the old iterative approach
@@ -160,35 +356,39 @@ class Utils:
                       '(error:', group_set_response.text, ')')
                 sys.exit()
 
-        group_cache_file = tempfile.NamedTemporaryFile(mode='w', delete=False)
-        cache_file_name = group_cache_file.name
-        group_cache_file.write(group_set_response.text)
-        group_cache_file.close()
-        with open(cache_file_name) as group_cache_file:
-            reader = csv.reader(group_cache_file)
+        # the export is parsed directly from memory (note: newline='' is needed so that quoted line breaks are handled)
+        with io.StringIO(group_set_response.text, newline='') as group_set_csv:
+            reader = csv.reader(group_set_csv)
             for row in reader:
                 if not csv_headers:
-                    csv_headers = row
+                    csv_headers = row  # the column positions we need are looked up just once
+                    login_id_column = csv_headers.index('login_id')
+                    group_name_column = csv_headers.index('group_name')
+                    group_id_column = csv_headers.index('canvas_group_id')
+                    name_column = csv_headers.index('name')
+                    user_id_column = csv_headers.index('canvas_user_id')
                     continue
 
+                login_id = row[login_id_column]
                 try:
                     # skip non-students, often with non-numeric IDs (but intentionally keep as a string) for later use
                     # as Canvas is inconsistent with its treatment of these (e.g., course users: int; groups: string)
-                    int(row[csv_headers.index('login_id')])
+                    int(login_id)
                 except ValueError:
-                    print('WARNING: skipping non-numeric group member login_id:', row[csv_headers.index('login_id')])
+                    print('WARNING: skipping non-numeric group member login_id:', login_id)
                     continue
-                if not row[csv_headers.index('group_name')]:  # course members not in a group have an empty group name
-                    print('WARNING: skipping course member not in any group:', row[csv_headers.index('login_id')])
+                group_name = row[group_name_column]
+                if not group_name:  # course members not in a group have an empty group name
+                    print('WARNING: skipping course member not in any group:', login_id)
                     continue
 
                 group_entry = {
-                    'group_name': row[csv_headers.index('group_name')],
-                    'group_id': row[csv_headers.index('canvas_group_id')],
-                    'group_number': int(row[csv_headers.index('group_name')].split(' ')[-1]),
-                    'student_number': row[csv_headers.index('login_id')],
-                    'student_name': row[csv_headers.index('name')],
-                    'student_canvas_id': row[csv_headers.index('canvas_user_id')]
+                    'group_name': group_name,
+                    'group_id': row[group_id_column],
+                    'group_number': int(group_name.split(' ')[-1]),
+                    'student_number': login_id,
+                    'student_name': row[name_column],
+                    'student_canvas_id': row[user_id_column]
                 }
 
                 if group_by in ['group_number', 'group_name']:
@@ -197,7 +397,6 @@ class Utils:
                     group_sets[group_entry[group_by]].append(group_entry)
                 else:
                     group_sets[group_entry['student_number']] = group_entry
-        os.remove(cache_file_name)
 
         print('Loaded', len(group_sets), 'valid group records from', course_group_tab_url)
         return group_set_id, dict(sorted(group_sets.items()))
@@ -213,21 +412,20 @@ class Utils:
             return None, None
 
         api_url = Utils.course_url_to_api(course_group_tab_url).split('/courses')[0]
-        group_set_response = Utils.canvas_multi_page_request('%s/group_categories/%d/groups' % (api_url, group_set_id),
-                                                             type_hint='group sets')
-        if not group_set_response:
+        group_set_json = Utils.canvas_multi_page_request('%s/group_categories/%d/groups' % (api_url, group_set_id),
+                                                         type_hint='group sets')
+        if group_set_json is None:
             print('ERROR: unable to load group sets; aborting')
             sys.exit()
 
-        group_set_json = json.loads(group_set_response)
-        for group in group_set_json:
-            group_members_response = Utils.canvas_multi_page_request('%s/groups/%d/users' % (api_url, group['id']),
-                                                                     type_hint='group')
-            if not group_members_response:
+        group_members = Utils.map_concurrently(lambda g: Utils.canvas_multi_page_request(
+            '%s/groups/%d/users' % (api_url, g['id']), type_hint='group'), group_set_json)
+
+        for group, group_members_json in zip(group_set_json, group_members):
+            if group_members_json is None:
                 print('WARNING: unable to load group members; skipping group', group)
                 continue
 
-            group_members_json = json.loads(group_members_response)
             for member in group_members_json:
                 try:
                     int(member['login_id'])  # ignore non-students, who often have non-numeric IDs
@@ -256,7 +454,7 @@ class Utils:
 
     @staticmethod
     def get_assignment_submissions(assignment_url, includes=None):
-        """Get a list of assignment submissions, returning a string that can be parsed as JSON. This function is simply
+        """Get a list of assignment submissions, returning a list of parsed JSON objects. This function is simply
         a wrapper around Utils.canvas_multi_page_request, but is kept to separate the API parameter complexity from
         the scripts that use this method"""
         # TODO: handle variants (include[]=submission_history): canvas.instructure.com/doc/api/submissions.html
@@ -275,44 +473,44 @@ class Utils:
         """Filter a list of submissions (in parsed JSON format). Setting groups_mode to True will remove any users who
         are not in a group, and skip any duplicates (which occur because Canvas associates group submissions with each
         group member individually). Setting include_unsubmitted to True will include all entries, even those that do
-        not actually have a submission. The ignored_users parameter is an array of Canvas user IDs, and is used to
-        remove specific submitters (typically the inbuilt test users)"""
+        not actually have a submission. The ignored_users parameter is a list (or set) of Canvas user IDs, and is used
+        to remove specific submitters (typically the inbuilt test users)"""
         filtered_submission_list = []
+        seen_group_ids = set()
+        ignored_users = frozenset(ignored_users) if ignored_users else None  # checked for every submission
         for submission in submission_list_json:
-            ignored_submission = False
             # TODO: sometimes groups without submissions do not appear at all in the submission list - is this fixable?
-            if ('workflow_state' in submission and submission['workflow_state'] == 'unsubmitted') \
-                    or 'workflow_state' not in submission:
-                if not include_unsubmitted:
-                    ignored_submission = True
-
-            if groups_mode and not ignored_submission:
-                if submission['group']['id'] is None:
-                    ignored_submission = True
-                else:
-                    for parsed_submission in filtered_submission_list:
-                        if submission['group']['id'] == parsed_submission['group']['id']:
-                            ignored_submission = True
-                            break
+            if not include_unsubmitted and submission.get('workflow_state', 'unsubmitted') == 'unsubmitted':
+                continue
 
             if ignored_users and submission['user_id'] in ignored_users:
-                ignored_submission = True
+                continue
 
-            if not ignored_submission:
-                if 'login_id' not in submission['user']:
-                    # this is the only reason to have the assignment URL in this function
-                    submission['user']['login_id'] = Utils.get_canvas_user_login_id(assignment_url,
-                                                                                    submission['user']['id'])
-                filtered_submission_list.append(submission)
+            if groups_mode:
+                group_id = submission['group']['id']
+                if group_id is None or group_id in seen_group_ids:
+                    continue
+                seen_group_ids.add(group_id)
 
-        if sort_entries:
-            filtered_submission_list = sorted(filtered_submission_list,
-                                              key=lambda entry: Utils.ordered_strings(
-                                                  entry['group']['name'] if groups_mode else entry['user']['login_id']))
+            filtered_submission_list.append(submission)
+
+        # this is the only reason to have the assignment URL in this function
+        missing_login_id_submissions = [s for s in filtered_submission_list if 'login_id' not in s['user']]
+        if missing_login_id_submissions:
+            login_ids = Utils.get_canvas_user_login_ids(assignment_url,
+                                                        [s['user']['id'] for s in missing_login_id_submissions])
+            for submission in missing_login_id_submissions:
+                submission['user']['login_id'] = login_ids[submission['user']['id']]
 
-        print('Loaded', 'and sorted' if sort_entries else '', len(filtered_submission_list), 'valid submissions',
-              '(discarded', (len(submission_list_json) - len(filtered_submission_list)),
-              'filtered, duplicate, invalid/incomplete or missing)')
+        if sort_entries:
+            # (sort keys are computed once per submission, not per comparison; they cannot be created in the loop above
+            # because missing login IDs are only filled in afterwards)
+            filtered_submission_list.sort(key=lambda entry: Utils.ordered_strings(
+                entry['group']['name'] if groups_mode else entry['user']['login_id']))
+
+        print('%s %d valid submissions (discarded %d filtered, duplicate, invalid/incomplete or missing)' % (
+            'Loaded and sorted' if sort_entries else 'Loaded', len(filtered_submission_list),
+            len(submission_list_json) - len(filtered_submission_list)))
         return filtered_submission_list
 
     @staticmethod
@@ -345,10 +543,12 @@ class Utils:
         marks_map = {}
         if os.path.exists(marks_file):
             if marks_file.lower().endswith('.xlsx'):
-                marks_workbook = openpyxl.load_workbook(marks_file)
-                marks_sheet = marks_workbook[marks_workbook.sheetnames[0]]
-                for row in marks_sheet.iter_rows():
-                    Utils.parse_marks_file_row(marks_map, [entry.value for entry in row])
+                # read-only mode streams rows rather than loading the whole workbook; data_only gives formula results
+                marks_workbook = openpyxl.load_workbook(marks_file, read_only=True, data_only=True)
+                marks_sheet = marks_workbook[marks_workbook.sheetnames[0]]  # not .active, which may be another sheet
+                for row in marks_sheet.iter_rows(max_col=3, values_only=True):  # only the first three columns are used
+                    Utils.parse_marks_file_row(marks_map, row)
+                marks_workbook.close()  # read-only workbooks keep their file open until closed
             else:
                 with open(marks_file, newline='') as marks_csv:
                     reader = csv.reader(marks_csv)
@@ -361,42 +561,72 @@ class Utils:
         """For a given assignment, get the list of students it is assigned to. In most cases it is better to use
         Utils.get_assignment_submissions, which returns users as part of its main response. However, the New Quizzes
         API does not return Login IDs, so for that script this method is used to match submissions instead"""
-        params = {'include[]': ['enrollments']}
-        user_list_response = Utils.canvas_multi_page_request('%s/users' % assignment_url.split('/assignments')[0],
-                                                             params=params, type_hint='assignment student list')
-        if not user_list_response:
-            return None
-
-        user_list_json = json.loads(user_list_response)
+        # Canvas can pre-filter the list to active students; their enrolments are still checked below because users may
+        # have more than one enrolment (e.g., an inactive student enrolment as well as an active TA one)
+        params = {'include[]': ['enrollments'], 'enrollment_type[]': ['student'], 'enrollment_state[]': ['active']}
         submission_student_map = []
-        for user in user_list_json:
-            for role in user['enrollments']:
-                if role['type'] == 'StudentEnrollment' and role['enrollment_state'] == 'active':
-                    if 'login_id' in user:
-                        student_number = user['login_id']
-                    else:
-                        student_number = Utils.get_canvas_user_login_id(assignment_url, user['id'])
-                    submission_student_map.append({'student_number': student_number, 'user_id': user['id']})
+        # only a few of each user's details are needed, so the (potentially large) list is processed page by page
+        for user_list_page in Utils.canvas_multi_page_iterator('%s/users' % assignment_url.split('/assignments')[0],
+                                                               params=params, type_hint='assignment student list'):
+            if user_list_page is None:
+                return None
+
+            for user in user_list_page:
+                # users can have several active student enrolments (e.g., in multiple sections), but are added once
+                if any(role['type'] == 'StudentEnrollment' and role['enrollment_state'] == 'active'
+                       for role in user['enrollments']):
+                    submission_student_map.append({'student_number': user.get('login_id'), 'user_id': user['id']})
+
+        missing_login_id_users = [s['user_id'] for s in submission_student_map if s['student_number'] is None]
+        if missing_login_id_users:
+            login_ids = Utils.get_canvas_user_login_ids(assignment_url, missing_login_id_users)
+            for student in submission_student_map:
+                if student['student_number'] is None:
+                    student['student_number'] = login_ids[student['user_id']]
         return submission_student_map
 
     @staticmethod
     def get_canvas_user_login_id(assignment_url, user_id):
         # Canvas has a bug where login_id is missing in some requests - need to get individually (slowly...)
+        if user_id in Utils.LOGIN_ID_CACHE:
+            return Utils.LOGIN_ID_CACHE[user_id]  # the same users are often affected in several lists (e.g., groups)
+
         print('WARNING: encountered Canvas bug in user list; requesting profile for', user_id, 'individually')
-        user_profile_response = requests.get('%s/users/%s/profile' % (assignment_url.split('/courses')[0], user_id),
-                                             headers=Utils.canvas_api_headers())
+        user_profile_response = Utils.SESSION.get(
+            '%s/users/%s/profile' % (assignment_url.split('/courses')[0], user_id))
         if user_profile_response.status_code != 200:
             print('ERROR: unable to load user profile for', user_id)
             return None  # TODO: is there anything else we can do?
         else:
-            return user_profile_response.json()['login_id']
+            login_id = Utils.response_json(user_profile_response)['login_id']
+            Utils.LOGIN_ID_CACHE[user_id] = login_id
+            return login_id
+
+    @staticmethod
+    def get_canvas_user_login_ids(assignment_url, user_ids):
+        """Look up the Login IDs of multiple users (see Utils.get_canvas_user_login_id) at the same time, returning a
+        dict mapping each Canvas user ID to its Login ID (or None if the user's profile could not be loaded)"""
+        unique_user_ids = list(dict.fromkeys(user_ids))
+        login_ids = Utils.map_concurrently(lambda user_id: Utils.get_canvas_user_login_id(assignment_url, user_id),
+                                           unique_user_ids)
+        return dict(zip(unique_user_ids, login_ids))
 
     @staticmethod
     def parse_marks_file_row(marks_map, row):
-        # ultra-simplistic check to avoid any header rows (headers are not normally numeric)
-        try:
-            grade = float(row[1])
-        except (ValueError, TypeError):
+        if len(row) < 2:  # e.g., blank lines in CSV files
+            return
+
+        # ultra-simplistic check to avoid any header rows (headers are not normally numeric) - spreadsheet values are
+        # typically already numbers, so only text values (i.e., from CSV files or text cells) need to be converted
+        grade = row[1]
+        if isinstance(grade, (int, float)):
+            grade = float(grade)
+        elif isinstance(grade, str):
+            try:
+                grade = float(grade)
+            except ValueError:
+                return
+        else:
             return
 
         student_number_or_group_name = str(row[0])
@@ -415,37 +645,50 @@ class Args:
         that one, both or neither are available to import"""
         tooey_ignore = '--ignore-tooey'
         gooey_ignore = '--ignore-gooey'
-        has_gooey = False
-        using_gooey = False
-        try:
-            # noinspection PyPackageRequirements,PyUnresolvedReferences
-            import gooey
-            has_gooey = True
-            if gooey_ignore not in sys.argv:
-                using_gooey = True
+
+        # a successful run with Gooey calls the program again with the actual arguments plus `--ignore-gooey` - in that
+        # case (or if requested manually) we don't even import Gooey, as loading it (and wxPython) is relatively slow
+        if gooey_ignore not in sys.argv:
+            try:
+                # noinspection PyPackageRequirements,PyUnresolvedReferences
+                import gooey
                 return gooey.Gooey(f)()
-        except ImportError:
-            pass
+            except ImportError:
+                pass
 
-        if not using_gooey:
+        # similarly, Tooey is not imported at all if it has been disabled
+        if tooey_ignore not in sys.argv:
             try:
                 # noinspection PyPackageRequirements,PyUnresolvedReferences
                 import tooey
-                if tooey_ignore not in sys.argv:
-                    if gooey_ignore in sys.argv:
-                        sys.argv.remove(gooey_ignore)
-                    return tooey.Tooey(f)()
+                if gooey_ignore in sys.argv:
+                    sys.argv.remove(gooey_ignore)
+                return tooey.Tooey(f)()
             except ImportError:
                 pass
 
-        if tooey_ignore in sys.argv:
-            sys.argv.remove(tooey_ignore)
+        for ignore_argument in (tooey_ignore, gooey_ignore):
+            if ignore_argument in sys.argv:
+                sys.argv.remove(ignore_argument)
+        return f()
 
-        if has_gooey:
-            # a successful run with Gooey calls the program again with the actual arguments plus `--ignore-gooey`
-            # noinspection PyUnboundLocalVariable
-            return gooey.Gooey(f)()
-        else:
-            if gooey_ignore in sys.argv:
-                sys.argv.remove(gooey_ignore)
-            return f()
+    @staticmethod
+    def positive_int(value):
+        """An argparse `type` for options that must be a whole number greater than zero (e.g., a number of requests to
+        send at the same time), so that invalid values are reported as a usage error before the script does anything"""
+        try:
+            number = int(value)
+        except ValueError:
+            number = 0
+        if number < 1:
+            raise argparse.ArgumentTypeError('%s is not a positive integer' % value)
+        return number
+
+    @staticmethod
+    def parallel_requests(value):
+        """An argparse `type` for options that set a number of API requests to send at the same time, which must be a
+        positive integer that is no larger than the shared session's connection pool (see Utils.CONNECTION_POOL_SIZE)"""
+        number = Args.positive_int(value)
+        if number > Utils.CONNECTION_POOL_SIZE:
+            raise argparse.ArgumentTypeError('%s is more than the maximum of %d' % (value, Utils.CONNECTION_POOL_SIZE))
+        return number
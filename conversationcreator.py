@@ -4,21 +4,21 @@ include a unique attachment file."""
 __author__ = 'Simon Robinson'
 __copyright__ = 'Copyright (c) 2024 Simon Robinson'
 __license__ = 'Apache 2.0'
-__version__ = '2024-03-14'  # ISO 8601 (YYYY-MM-DD)
+__version__ = '2026-10-15'  # ISO 8601 (YYYY-MM-DD)
 
 import argparse
 import csv
-import json
+import io
 import mimetypes
 import os
 import sys
 
 import openpyxl
-import requests
 
 from canvashelpers import Args, Utils
 
 DEFAULT_MESSAGE = 'See attached file'
+MAXIMUM_BATCH_RECIPIENTS = 100  # Canvas's default limit for the number of recipients of a single conversation request
 
 
 def get_args():
@@ -55,8 +55,9 @@ def get_args():
                         help='The subject of the conversation. The default value is \'Course message\'')
     parser.add_argument('--conversation-message', default=DEFAULT_MESSAGE,
                         help='The conversation message to be sent. The default value is \'%s\', but this can be '
-                             'overridden via this parameter or `--comments-file`. Use \\n for linebreaks' %
-                             DEFAULT_MESSAGE)
+                             'overridden via this parameter or `--comments-file`. When using the default value, '
+                             'recipients who have neither an attachment nor a message in `--comments-file` are '
+                             'skipped. Use \\n for linebreaks' % DEFAULT_MESSAGE)
     parser.add_argument('--delete-after-sending', action='store_true',
                         help='Sending messages using this script can fill up your Sent folder. If that is an issue, '
                              'use this parameter to remove sent messages after sending. This only affects your own '
@@ -70,6 +71,9 @@ def get_args():
                              'parameter is set, all others except `--dry-run` are ignored, and the script will exit '
                              'after completion. Once deleted, attachments are unavailable to both yourself *and* '
                              'message recipients')
+    parser.add_argument('--parallel-messages', type=Args.parallel_requests, default=4,
+                        help='The number of recipients to send messages to (and upload attachments for) '
+                             'simultaneously (at most %d). Default: 4' % Utils.CONNECTION_POOL_SIZE)
     parser.add_argument('--dry-run', action='store_true',
                         help='Preview the script\'s actions without actually making any changes. Highly recommended!')
     return parser.parse_args()
@@ -79,14 +83,14 @@ args = Args.interactive(get_args)
 COURSE_URL = Utils.course_url_to_api(args.url[0])
 COURSE_ID = Utils.get_course_id(COURSE_URL)
 API_ROOT = COURSE_URL.split('/courses')[0]
+CANVAS_ROOT = args.url[0].split('/courses')[0]
 
 # deleting files is a separate mode
 if args.delete_conversation_attachments:
     folder_name = 'conversation attachments'
     print('DRY RUN:' if args.dry_run else '', 'removing all files from your `%s` folder' % folder_name)
 
-    attachments_response = requests.get('%s/users/self/folders/by_path/%s' % (API_ROOT, folder_name),
-                                        headers=Utils.canvas_api_headers())
+    attachments_response = Utils.SESSION.get('%s/users/self/folders/by_path/%s' % (API_ROOT, folder_name))
     if attachments_response.status_code != 200:
         print('ERROR: unable to find your `%s` folder; aborting' % folder_name)
         sys.exit()
@@ -95,26 +99,23 @@ if args.delete_conversation_attachments:
         print('ERROR: unable to match your `%s` folder; aborting' % folder_name)
         sys.exit()
 
-    folder_id = attachments_folder['id']
-    user_files = Utils.canvas_multi_page_request('%s/users/self/files' % API_ROOT, type_hint='files')
-    if not user_files:
-        print('No files found in your user account; nothing to do')
+    # note: the folder files API only returns files that are directly within the requested folder (rather than all of
+    # the user's files, which would then need to be filtered)
+    folder_files_json = Utils.canvas_multi_page_request('%s/folders/%d/files' % (API_ROOT, attachments_folder['id']),
+                                                        type_hint='files')
+    if folder_files_json is None:
+        print('ERROR: unable to retrieve the contents of your `%s` folder; aborting' % folder_name)
         sys.exit()
 
-    user_files_json = json.loads(user_files)
-    files_to_delete = []
-    for file in user_files_json:
-        if file['folder_id'] == folder_id:
-            files_to_delete.append(file['id'])
+    files_to_delete = [file['id'] for file in folder_files_json]
 
     if len(files_to_delete) > 0:
         print('DRY RUN: would delete' if args.dry_run else 'Deleting', len(files_to_delete),
               'files from your `%s` folder' % folder_name)
         if args.dry_run:
             sys.exit()
-        for file_id in files_to_delete:
-            delete_request = requests.delete('%s/files/%d' % (API_ROOT, file_id),
-                                             headers=Utils.canvas_api_headers())
+        for delete_request in Utils.map_concurrently(
+                lambda file_id: Utils.SESSION.delete('%s/files/%d' % (API_ROOT, file_id)), files_to_delete):
             if delete_request.status_code == 200:
                 print('Deleted file', delete_request.text)
     else:
@@ -129,21 +130,27 @@ if not os.path.exists(INPUT_DIRECTORY):
           'upload (and any `--comments-file`) in the folder %s' % INPUT_DIRECTORY)
 print('%screating conversations for course %s' % ('DRY RUN: ' if args.dry_run else '', args.url[0]))
 
+# all attachments have the same extension, so their MIME type only needs to be determined once
+ATTACHMENT_MIME_TYPE = args.attachment_mime_type or mimetypes.guess_type('attachment.%s' % args.attachment_extension)[0]
+
 # load and parse comments
-comments_map = {}
+comments_map = {}  # note: identifiers are stored as strings (spreadsheet cells may be numeric, but Canvas IDs are not)
 if args.comments_file:
     comments_file = os.path.join(INPUT_DIRECTORY, args.comments_file)
     if os.path.exists(comments_file):
         if comments_file.lower().endswith('.xlsx'):
-            comments_workbook = openpyxl.load_workbook(comments_file)
+            comments_workbook = openpyxl.load_workbook(comments_file, read_only=True, data_only=True)
             comments_sheet = comments_workbook[comments_workbook.sheetnames[0]]
-            for row in comments_sheet.iter_rows():
-                comments_map[row[0].value] = row[1].value
+            for row in comments_sheet.iter_rows(max_col=2, values_only=True):  # only the first two columns are used
+                if row[0] is not None:
+                    comments_map[str(row[0]).strip()] = row[1]
+            comments_workbook.close()  # read-only workbooks keep their file open until closed
         else:
             with open(comments_file, newline='') as marks_csv:
                 reader = csv.reader(marks_csv)
                 for row in reader:
-                    comments_map[row[0]] = row[1]
+                    if len(row) > 1:  # skip blank lines (and rows without a message)
+                        comments_map[row[0].strip()] = row[1]
         print('Loaded comments mapping for', len(comments_map), 'people/groups:', comments_map)
     else:
         print('Ignoring comments file argument', args.comments_file, '- not found in course directory at',
@@ -156,11 +163,10 @@ if args.groups:
         print('ERROR: unable to get group set ID from given URL', args.url[0])
         sys.exit()
 else:
-    course_user_response = Utils.get_course_users(COURSE_URL, enrolment_types=['student'])
-    if not course_user_response:
+    message_recipient_json = Utils.get_course_users(COURSE_URL, enrolment_types=['student'])
+    if message_recipient_json is None:
         print('ERROR: unable to retrieve course student list; aborting')
         sys.exit()
-    message_recipient_json = json.loads(course_user_response)
 
 SELF_ID, user_name = Utils.get_user_details(API_ROOT, user_id='self')
 if not SELF_ID:
@@ -171,62 +177,90 @@ if not SELF_ID:
 #     os.path.splitext(os.path.basename(__file__))[0], COURSE_ID, int(time.time()))
 FILES_SUBFOLDER_PATH = 'conversation attachments'
 print('Generating', len(message_recipient_json), 'conversations and uploading attachments to %s\'s folder:' % user_name,
-      '%s/files/folder/users_%d/%s' % (args.url[0].split('/courses')[0], SELF_ID,
+      '%s/files/folder/users_%d/%s' % (CANVAS_ROOT, SELF_ID,
                                        FILES_SUBFOLDER_PATH.replace(' ', '%20')))  # display formatting only
 
-recipient_count = 0
 recipient_total = len(message_recipient_json)
-for recipient in message_recipient_json:
-    recipient_count += 1
-    print('\nProcessing message', recipient_count, 'of', recipient_total, 'to', end=' ')
+
+
+def build_conversation_data(recipient_ids, message):
+    """Create the request parameters for sending the given message to each of the given recipients (or groups)"""
+    # see: https://canvas.instructure.com/doc/api/conversations.html#method.conversations.create
+    conversation_data = {
+        'recipients[]': recipient_ids,
+        'subject': args.conversation_subject,
+        'body': message.replace('\\n', '\n'),
+        'force_new': True,
+        'group_conversation': True if args.groups else 'false',  # note: must be string for false
+        'context_code': 'course_%d' % COURSE_ID
+    }
+    if args.groups:
+        # the API is not clear whether the course or group context is most appropriate for group messages... either way,
+        # these still seem to show as individual messages in the web interface (i.e., Reply All doesn't include groups)
+        conversation_data['context_code'] = recipient_ids[0]
+    return conversation_data
+
+
+def delete_sent_message(conversation_id):
+    """Remove a sent conversation from the sender's own view, returning the result as a progress message"""
+    message_deletion_response = Utils.SESSION.delete('%s/conversations/%d' % (API_ROOT, conversation_id))
+    if message_deletion_response.status_code == 200:
+        return '\tRemoved message from your sent items folder\n'
+    return '\tWARNING: unable to remove message from your sent items folder: %s\n' % message_deletion_response.text
+
+
+def send_message(numbered_recipient):
+    """Create the conversation (and upload any attachment) for a single recipient, returning its progress messages
+    and, if the message is instead to be sent in a batch with others that are identical, the recipient's Canvas ID"""
+    output = io.StringIO()
+    recipient_count, recipient = numbered_recipient
+    print('\nProcessing message', recipient_count, 'of', recipient_total, 'to', end=' ', file=output)
     if args.groups:
         recipient_identifier = message_recipient_json[recipient][0]['group_name']
         canvas_recipient_id = 'group_%s' % message_recipient_json[recipient][0]['group_id']
-        print(recipient_identifier, [r['student_number'] for r in message_recipient_json[recipient]])
+        print(recipient_identifier, [r['student_number'] for r in message_recipient_json[recipient]], file=output)
     else:
         recipient_identifier = recipient['login_id']
         canvas_recipient_id = recipient['id']
-        print(recipient['name'], '(%s)' % recipient_identifier)
+        print(recipient['name'], '(%s)' % recipient_identifier, file=output)
 
     attachment_file = '%s.%s' % (recipient_identifier, args.attachment_extension)
     attachment_path = os.path.join(INPUT_DIRECTORY, attachment_file)
-    attachment_mime_type = args.attachment_mime_type or mimetypes.guess_type(attachment_path)[0]
+    attachment_mime_type = ATTACHMENT_MIME_TYPE
     attachment_exists = os.path.exists(attachment_path)
 
     if attachment_exists and attachment_mime_type:
-        print('Found conversation attachment file', attachment_file, 'with MIME type', attachment_mime_type)
+        print('Found conversation attachment file', attachment_file, 'with MIME type', attachment_mime_type,
+              file=output)
     else:
         print('Attachment %s at %s' % (attachment_file, os.path.dirname(attachment_path)),
               'not found;' if not attachment_exists else 'is not of a recognised MIME type;',
-              'skipping upload for this submission')
+              'skipping upload for this submission', file=output)
         attachment_file = None
 
     # filter out unset fields, allowing any combination of mark/comment/attachment)
-    conversation_message = args.conversation_message
-    if recipient_identifier in comments_map and comments_map[recipient_identifier]:
-        conversation_message = comments_map[recipient_identifier]
+    conversation_message = comments_map.get(recipient_identifier) or args.conversation_message
+    if not attachment_file and conversation_message == DEFAULT_MESSAGE:
+        # (the default message refers to an attachment, so sending it alone would be confusing)
+        print('No attachment or message content for this recipient; skipping', file=output)
+        return output.getvalue(), None
 
-    # see: https://canvas.instructure.com/doc/api/submissions.html#method.submissions_api.update
-    conversation_data = {
-        'recipients[]': [canvas_recipient_id],
-        'subject': args.conversation_subject,
-        'body': conversation_message.replace('\\n', '\n'),
-        'force_new': True,
-        'group_conversation': True if args.groups else 'false',  # note: must be string for false
-        'context_code': 'course_%d' % COURSE_ID
-    }
-    if args.groups:
-        # the API is not clear whether the course or group context is most appropriate for group messages... either way,
-        # these still seem to show as individual messages in the web interface (i.e., Reply All doesn't include groups)
-        conversation_data['context_code'] = canvas_recipient_id
+    conversation_data = build_conversation_data([canvas_recipient_id], conversation_message)
     if conversation_message != args.conversation_message:
-        print('Adding conversation message from spreadsheet:', conversation_message)
+        print('Adding conversation message from spreadsheet:', conversation_message, file=output)
     else:
-        print('Using conversation message provided as script argument:', conversation_message)
+        print('Using conversation message provided as script argument:', conversation_message, file=output)
+
+    # (checked before the dry run exit below so that a dry run also shows which recipients would be batched)
+    if not args.groups and not attachment_file and conversation_message == args.conversation_message:
+        print('\tMessage is not personalised; sending in a batch along with other recipients of the same message',
+              file=output)
+        return output.getvalue(), canvas_recipient_id
 
     if args.dry_run:
-        print('DRY RUN: skipping attachment upload and message posting/deletion steps; moving to next recipient')
-        continue
+        print('DRY RUN: skipping attachment upload and message posting/deletion steps; moving to next recipient',
+              file=output)
+        return output.getvalue(), None
 
     if attachment_file:
         # if there is an attachment we first need to request an upload URL, then associate with a submission comment
@@ -238,45 +272,73 @@ for recipient in message_recipient_json:
             # clashing names are overwritten, and the old version shows as deleted to its original recipients)
             # 'on_duplicate': 'rename'
         }
-        file_submission_url_response = requests.post('%s/users/self/files' % API_ROOT, data=submission_form_data,
-                                                     headers=Utils.canvas_api_headers())
+        file_submission_url_response = Utils.SESSION.post('%s/users/self/files' % API_ROOT, data=submission_form_data)
         if file_submission_url_response.status_code != 200:
-            print('\tERROR: unable to retrieve attachment upload URL; skipping submission')
-            continue
+            print('\tERROR: unable to retrieve attachment upload URL; skipping submission', file=output)
+            return output.getvalue(), None
 
         file_submission_url_json = file_submission_url_response.json()
-        print('\tUploading attachment to', file_submission_url_json['upload_url'].split('?')[0], '[truncated]')
+        print('\tUploading attachment to', file_submission_url_json['upload_url'].split('?')[0], '[truncated]',
+              file=output)
 
-        files_data = {'file': (attachment_file, open(attachment_path, 'rb'))}
-        file_submission_upload_response = requests.post(file_submission_url_json['upload_url'],
-                                                        data=submission_form_data, files=files_data,
-                                                        headers=Utils.canvas_api_headers())
+        with open(attachment_path, 'rb') as attachment_data:
+            files_data = {'file': (attachment_file, attachment_data, attachment_mime_type)}
+            file_submission_upload_response = Utils.SESSION.post(file_submission_url_json['upload_url'],
+                                                                 data=submission_form_data, files=files_data)
 
         if file_submission_upload_response.status_code != 201:  # note: 201 Created
-            print('\tERROR: unable to upload attachment file; skipping recipient')
-            continue
+            print('\tERROR: unable to upload attachment file; skipping recipient', file=output)
+            return output.getvalue(), None
 
         file_submission_upload_json = file_submission_upload_response.json()
-        print('\tAssociating uploaded file', file_submission_upload_json['id'], 'with conversation')
+        print('\tAssociating uploaded file', file_submission_upload_json['id'], 'with conversation', file=output)
         conversation_data['attachment_ids[]'] = [file_submission_upload_json['id']]
 
-    message_creation_response = requests.post('%s/conversations' % API_ROOT, data=conversation_data,
-                                              headers=Utils.canvas_api_headers())
+    message_creation_response = Utils.SESSION.post('%s/conversations' % API_ROOT, data=conversation_data)
     if message_creation_response.status_code != 201:
-        print('\tERROR: unable to send conversation message and/or associate attachment; skipping recipient')
-        continue
+        print('\tERROR: unable to send conversation message and/or associate attachment; skipping recipient',
+              file=output)
+        return output.getvalue(), None
+
+    sent_conversation_id = message_creation_response.json()[0]['id']
 
     # the link we print is the same as the one Canvas itself uses in notification emails, but the current web behaviour
     # is to redirect rather uselessly to the message inbox (or return 404 if --delete-after-sending has been set)
     print('\tMessage successfully sent to', recipient_identifier,
           '(%s%s)' % ('' if args.groups else 'user ', canvas_recipient_id), ':',
-          '%s/conversations/%d' % (args.url[0].split('/courses')[0], message_creation_response.json()[0]['id']))
+          '%s/conversations/%d' % (CANVAS_ROOT, sent_conversation_id), file=output)
 
     if args.delete_after_sending:
-        sent_message = message_creation_response.json()
-        message_deletion_response = requests.delete('%s/conversations/%d' % (API_ROOT, sent_message[0]['id']),
-                                                    headers=Utils.canvas_api_headers())
-        if message_deletion_response.status_code == 200:
-            print('\tRemoved message from your sent items folder')
-        else:
-            print('\tWARNING: unable to remove message from your sent items folder:', message_deletion_response.text)
+        output.write(delete_sent_message(sent_conversation_id))
+    return output.getvalue(), None
+
+
+shared_message_recipients = []
+for message_output, shared_message_recipient in Utils.map_concurrently(
+        send_message, enumerate(message_recipient_json, start=1), max_workers=args.parallel_messages):
+    print(message_output, end='')
+    if shared_message_recipient:
+        shared_message_recipients.append(shared_message_recipient)
+
+# Canvas can create separate private conversations with many recipients in a single request, so the (typically
+# common) generic message is sent to everyone who needs it in batches, rather than one recipient at a time
+batch_starts = range(0, len(shared_message_recipients), MAXIMUM_BATCH_RECIPIENTS)
+for batch_number, batch_start in enumerate(batch_starts, start=1):
+    batch_recipients = shared_message_recipients[batch_start:batch_start + MAXIMUM_BATCH_RECIPIENTS]
+    print('\nDRY RUN: would send' if args.dry_run else '\nSending', 'shared message to', len(batch_recipients),
+          'recipients (batch %d of %d):' % (batch_number, len(batch_starts)), batch_recipients)
+    if args.dry_run:
+        continue
+    # (batched messages are never group messages, so each recipient gets their own private conversation)
+    message_creation_response = Utils.SESSION.post(
+        '%s/conversations' % API_ROOT, data=build_conversation_data(batch_recipients, args.conversation_message))
+    if message_creation_response.status_code != 201:
+        print('\tERROR: unable to send conversation message; skipping these recipients')
+        continue
+
+    sent_conversations = Utils.response_json(message_creation_response)
+    print('\tMessage successfully sent as', len(sent_conversations), 'conversations:',
+          ['%s/conversations/%d' % (CANVAS_ROOT, c['id']) for c in sent_conversations])
+    if args.delete_after_sending:
+        for deletion_output in Utils.map_concurrently(delete_sent_message, [c['id'] for c in sent_conversations]):
+            print(deletion_output, end='')
@@ -5,14 +5,11 @@ easily delete some or all course content before starting again or importing from
 __author__ = 'Simon Robinson'
 __copyright__ = 'Copyright (c) 2024 Simon Robinson'
 __license__ = 'Apache 2.0'
-__version__ = '2024-06-18'  # ISO 8601 (YYYY-MM-DD)
+__version__ = '2026-10-15'  # ISO 8601 (YYYY-MM-DD)
 
 import argparse
-import json
 import sys
 
-import requests
-
 from canvashelpers import Args, Utils
 
 
@@ -38,8 +35,9 @@ def get_args():
 
 args = Args.interactive(get_args)
 COURSE_URL = Utils.course_url_to_api(args.url[0])
+API_ROOT = COURSE_URL.split('/courses')[0]
 
-course_details_response = requests.get(COURSE_URL, headers=Utils.canvas_api_headers())
+course_details_response = Utils.SESSION.get(COURSE_URL)
 if course_details_response.status_code != 200:
     print('ERROR: unable to retrieve course details; aborting')
     sys.exit()
@@ -60,36 +58,53 @@ def confirm_action(type_hint, action_hint='deleting ALL'):
         sys.exit('ERROR: aborting deletion; confirmation refused')
 
 
+def delete_concurrently(deletion_urls, params=None):
+    """Send a DELETE request to each of the given URLs, returning the responses in the same order"""
+    return list(Utils.map_concurrently(lambda deletion_url: Utils.SESSION.delete(deletion_url, params=params),
+                                       deletion_urls))
+
+
+def report_deletions(type_hint, items, deletion_urls, deletion_responses):
+    """Print the result of each deletion, then a summary. Full item details are only printed for deletions that
+    failed, as the item listings for large courses can be very long"""
+    failed_count = 0
+    for item, deletion_url, deletion_response in zip(items, deletion_urls, deletion_responses):
+        if deletion_response.status_code == 200:
+            print('\tDeleted %s at %s' % (type_hint, deletion_url))
+        else:
+            failed_count += 1
+            print('\tWARNING: unable to delete', type_hint, 'at %s:' % deletion_url, deletion_response.text, '-', item)
+    print('Finished %s deletion: %d deleted; %d failed' % (type_hint, len(items) - failed_count, failed_count))
+
+
 # for many content types the basic listing and deletion process follows a very similar pattern
 def delete_items(content_list_path, type_hint, params=None):
-    content_list_response = Utils.canvas_multi_page_request(content_list_path, params=params,
-                                                            type_hint='course %s list' % type_hint)
-    if not content_list_response:
+    content_list_json = Utils.canvas_multi_page_request(content_list_path, params=params,
+                                                        type_hint='course %s list' % type_hint)
+    if content_list_json is None:
         print('ERROR: unable to retrieve course', type_hint, 'list; aborting')
         sys.exit()
-    content_list_json = json.loads(content_list_response)
 
-    for content_item in content_list_json:
-        content_item_deletion_url = '%s/%d' % (content_list_path, content_item['id'])
-        content_item_deletion_response = requests.delete(content_item_deletion_url, headers=Utils.canvas_api_headers())
-        if content_item_deletion_response.status_code == 200:
-            print('\tDeleted %s at %s:' % (type_hint, content_item_deletion_url), content_item)
-        else:
-            print('\tWARNING: unable to delete', type_hint, 'at %s:' % content_item_deletion_url,
-                  content_item_deletion_response.text, '-', content_item)
-    print('Deleted', len(content_list_json), type_hint, 'items')
+    content_item_deletion_urls = ['%s/%d' % (content_list_path, item['id']) for item in content_list_json]
+    report_deletions(type_hint, content_list_json, content_item_deletion_urls,
+                     delete_concurrently(content_item_deletion_urls))
 
 
+# all confirmations are requested before any changes are made so that cleaning can then proceed without interruption
 if args.reset or args.all:
     confirm_action(action_hint='resetting to the default all', type_hint='settings')
+for content_type in ['pages', 'modules', 'assignments', 'rubrics', 'quizzes', 'discussions', 'announcements', 'events',
+                     'files']:
+    if getattr(args, content_type) or args.all:
+        confirm_action(type_hint=content_type)
 
+if args.reset or args.all:
     # reset navigation items
     course_content_path = '%s/tabs' % COURSE_URL
-    course_content_response = Utils.canvas_multi_page_request(course_content_path, type_hint='course navigation list')
-    if not course_content_response:
+    course_content_json = Utils.canvas_multi_page_request(course_content_path, type_hint='course navigation list')
+    if course_content_json is None:
         print('ERROR: unable to retrieve course navigation list; aborting')
         sys.exit()
-    course_content_json = json.loads(course_content_response)
 
     ignored_tabs = ['home', 'settings']  # these items cannot be modified
     tab_order = {
@@ -118,8 +133,7 @@ if args.reset or args.all:
         item_params = {'hidden': item_hidden}
         if item_position > 0:
             item_params['position'] = item_position
-        tab_update_response = requests.put('%s/%s' % (course_content_path, item_id), params=item_params,
-                                           headers=Utils.canvas_api_headers())
+        tab_update_response = Utils.SESSION.put('%s/%s' % (course_content_path, item_id), params=item_params)
         if tab_update_response.status_code == 200:
             print('\tUpdated navigation item', item['label'], '- hidden:', item_hidden,
                   ('(position: %d)' % item_position) if item_position > 0 else '')
@@ -131,7 +145,7 @@ if args.reset or args.all:
         # note: if the front page is not set this will fail, which is why it is separated from other settings
         'course[default_view]': 'wiki'  # `wiki` is a Page; can also be `modules`, `assignments`, etc (see Courses API)
     }
-    course_update_response = requests.put(COURSE_URL, params=course_settings, headers=Utils.canvas_api_headers())
+    course_update_response = Utils.SESSION.put(COURSE_URL, params=course_settings)
     if course_update_response.status_code == 200:
         print('\nReset course homepage to default (`wiki`)')
     else:
@@ -145,7 +159,7 @@ if args.reset or args.all:
         'show_announcements_on_home_page': True,
         'home_page_announcement_limit': 1  # show one announcement on the home page
     }
-    course_update_response = requests.put(COURSE_URL, params=course_settings, headers=Utils.canvas_api_headers())
+    course_update_response = Utils.SESSION.put(COURSE_URL, params=course_settings)
     if course_update_response.status_code == 200:
         print('\nReset course basic settings: set format to `on_campus` and removed default images')
     else:
@@ -158,86 +172,60 @@ if args.reset or args.all:
         'restrict_student_past_view': True,  # restrict viewing after its end date
         'hide_sections_on_course_users_page': True  # sections are just used for enrolment; no need to be visible
     }
-    course_update_response = requests.put('%s/settings' % COURSE_URL, params=course_settings,
-                                          headers=Utils.canvas_api_headers())
+    course_update_response = Utils.SESSION.put('%s/settings' % COURSE_URL, params=course_settings)
     if course_update_response.status_code == 200:
         print('\nReset course advanced settings: set default deadline to 11am and restricted viewing outside start/end')
     else:
         print('\nERROR: unable to update course advanced settings:', course_update_response.text)
 
 if args.pages or args.all:
-    confirm_action(type_hint='pages')
-
     course_content_path = '%s/pages' % COURSE_URL
-    course_content_response = Utils.canvas_multi_page_request(course_content_path, type_hint='course pages')
-    if not course_content_response:
+    course_content_json = Utils.canvas_multi_page_request(course_content_path, type_hint='course pages')
+    if course_content_json is None:
         print('ERROR: unable to retrieve course pages list; aborting')
         sys.exit()
-    course_content_json = json.loads(course_content_response)
-
-    # the front page cannot be deleted, so we must unset this property first
-    for item in course_content_json:
-        if item['front_page']:
-            front_page_url = '%s/%d' % (course_content_path, item['page_id'])
-            front_page_response = requests.put(front_page_url, params={'wiki_page[front_page]': False},
-                                               headers=Utils.canvas_api_headers())
-            if front_page_response.status_code == 200:
-                print('\tDeactivated front page at %s:' % front_page_url, item)
-            else:
-                print('\tWARNING: unable to unset front page at %s:' % front_page_url,
-                      '- will not be able to delete page:', front_page_response.text, '-', item)
 
-    for item in course_content_json:
-        item_deletion_url = '%s/%d' % (course_content_path, item['page_id'])
-        item_deletion_response = requests.delete(item_deletion_url, headers=Utils.canvas_api_headers())
-        if item_deletion_response.status_code == 200:
-            print('\tDeleted page at %s:' % item_deletion_url, item)
+    # the front page cannot be deleted, so we must unset this property first (a course has at most one front page)
+    front_page = next((item for item in course_content_json if item['front_page']), None)
+    if front_page:
+        front_page_url = '%s/%d' % (course_content_path, front_page['page_id'])
+        front_page_response = Utils.SESSION.put(front_page_url, params={'wiki_page[front_page]': False})
+        if front_page_response.status_code == 200:
+            print('\tDeactivated front page at %s:' % front_page_url, front_page)
         else:
-            print('\tWARNING: %sunable to delete page at %s:' % (
-                'Canvas does not allow deleting the front page; ' if item[
-                    'front_page'] else '', item_deletion_url), item_deletion_response.text, '-', item)
-    print('Deleted', len(course_content_json), 'pages')
+            print('\tWARNING: unable to unset front page at %s:' % front_page_url,
+                  '- will not be able to delete page:', front_page_response.text, '-', front_page)
 
-if args.modules or args.all:
-    confirm_action(type_hint='modules')
+    # (note: Canvas does not allow deleting the front page, so this will fail if it could not be unset above)
+    item_deletion_urls = ['%s/%d' % (course_content_path, item['page_id']) for item in course_content_json]
+    report_deletions('page', course_content_json, item_deletion_urls, delete_concurrently(item_deletion_urls))
 
+if args.modules or args.all:
     course_content_path = '%s/modules' % COURSE_URL
-    course_content_response = Utils.canvas_multi_page_request(course_content_path, type_hint='course modules')
-    if not course_content_response:
+    course_content_json = Utils.canvas_multi_page_request(course_content_path, type_hint='course modules')
+    if course_content_json is None:
         print('ERROR: unable to retrieve course modules list; aborting')
         sys.exit()
-    course_content_json = json.loads(course_content_response)
 
-    for item in course_content_json:
-        content_item_path = '%s/%d/items' % (course_content_path, item['id'])
-        content_item_response = Utils.canvas_multi_page_request(content_item_path, type_hint='course module items')
-        if not content_item_response:
-            print('ERROR: unable to retrieve course module item list; aborting')
-            sys.exit()
-        content_item_json = json.loads(content_item_response)
-
-        for sub_item in content_item_json:
-            sub_item_deletion_url = '%s/%d' % (content_item_path, sub_item['id'])
-            sub_item_deletion_response = requests.delete(sub_item_deletion_url, headers=Utils.canvas_api_headers())
-            if sub_item_deletion_response.status_code == 200:
-                print('\tDeleted module item at %s:' % sub_item_deletion_url, sub_item)
-            else:
-                print('\tWARNING: unable to delete module item at %s:' % sub_item_deletion_url,
-                      sub_item_deletion_response.text, '-', sub_item)
-        print('Deleted', len(content_item_json), 'module items')
-
-        item_deletion_url = '%s/%s' % (course_content_path, item['id'])
-        item_deletion_response = requests.delete(item_deletion_url, headers=Utils.canvas_api_headers())
-        if item_deletion_response.status_code == 200:
-            print('\tDeleted module at %s:' % item_deletion_url, item)
-        else:
-            print('\tWARNING: unable to delete module item at %s:' % item_deletion_url, item_deletion_response.text,
-                  '-', item)
-    print('Deleted', len(course_content_json), 'modules')
+    # all modules' items are listed (and then deleted) together, and only then are the modules themselves removed
+    content_item_paths = ['%s/%d/items' % (course_content_path, item['id']) for item in course_content_json]
+    content_item_lists = list(Utils.map_concurrently(
+        lambda path: Utils.canvas_multi_page_request(path, type_hint='course module items'), content_item_paths))
+    if None in content_item_lists:
+        print('ERROR: unable to retrieve course module item list; aborting')
+        sys.exit()
 
-if args.assignments or args.all:
-    confirm_action(type_hint='assignments')
+    sub_items = []
+    sub_item_deletion_urls = []
+    for content_item_path, content_item_json in zip(content_item_paths, content_item_lists):
+        sub_items.extend(content_item_json)
+        sub_item_deletion_urls.extend('%s/%d' % (content_item_path, sub_item['id']) for sub_item in content_item_json)
+    report_deletions('module item', sub_items, sub_item_deletion_urls, delete_concurrently(sub_item_deletion_urls))
+
+    item_deletion_urls = ['%s/%d' % (course_content_path, item['id']) for item in course_content_json]
+    report_deletions('module', course_content_json, item_deletion_urls, delete_concurrently(item_deletion_urls))
 
+if args.assignments or args.all:
     # assignments are split into groups, but unlike modules their APIs are not linked
     delete_items(content_list_path='%s/assignments' % COURSE_URL, type_hint='assignment')
 
@@ -245,68 +233,47 @@ if args.assignments or args.all:
     delete_items(content_list_path='%s/assignment_groups' % COURSE_URL, type_hint='assignment group')
 
 if args.rubrics or args.all:
-    confirm_action(type_hint='rubrics')
     delete_items(content_list_path='%s/rubrics' % COURSE_URL, type_hint='rubric')
 
 if args.quizzes or args.all:
-    confirm_action(type_hint='quizzes')
     delete_items(content_list_path='%s/quizzes' % COURSE_URL, type_hint='quiz')
 
     # "New Quizzes" have a completely different API path (of course they do)
     delete_items(content_list_path='%s/quizzes' % COURSE_URL.replace('/api/v1', '/api/quiz/v1'), type_hint='new quiz')
 
 if args.discussions or args.all:
-    confirm_action(type_hint='discussions')
     delete_items(content_list_path='%s/discussion_topics' % COURSE_URL, type_hint='discussion')
 
 if args.announcements or args.all:
-    confirm_action(type_hint='announcements')
-
     # announcements are retrieved via the discussions API with a special parameter
     delete_items(content_list_path='%s/discussion_topics' % COURSE_URL, type_hint='announcement',
                  params={'only_announcements': True})
 
 if args.events or args.all:
-    confirm_action(type_hint='events')
-    delete_items('%s/calendar_events' % COURSE_URL.split('/courses')[0], type_hint='event',
+    delete_items('%s/calendar_events' % API_ROOT, type_hint='event',
                  params={'all_events': True, 'context_codes[]': ['course_%d' % COURSE_ID]})
 
 if args.files or args.all:
-    confirm_action(type_hint='files')
-
     # first we delete all folders (forcing deletion of non-empty items and their content)
     course_content_path = '%s/folders' % COURSE_URL
-    course_content_response = Utils.canvas_multi_page_request(course_content_path, type_hint='course folders')
-    if not course_content_response:
+    course_content_json = Utils.canvas_multi_page_request(course_content_path, type_hint='course folders')
+    if course_content_json is None:
         print('ERROR: unable to retrieve course folders list; aborting')
         sys.exit()
-    course_content_json = json.loads(course_content_response)
 
-    for item in course_content_json:
-        if item['parent_folder_id'] is None:
-            continue  # don't try to delete the root folder (which will fail anyway)
-        item_deletion_url = '%s/folders/%d' % (course_content_path.split('/courses')[0], item['id'])
-        item_deletion_response = requests.delete(item_deletion_url, params={'force': 'true'},  # note: must be a string
-                                                 headers=Utils.canvas_api_headers())
-        if item_deletion_response.status_code == 200:
-            print('\tDeleted folder at %s:' % item_deletion_url, item)
-        else:
-            print('\tWARNING: unable to delete folder at %s:' % item_deletion_url, item_deletion_response.text,
-                  '-', item)
-    print('Deleted', len(course_content_json), 'folders')
+    # don't try to delete the root folder (which will fail anyway) - and because deletion is forced, deleting its
+    # direct subfolders also removes everything below them, so nested folders do not need their own requests
+    root_folder_ids = {item['id'] for item in course_content_json if item['parent_folder_id'] is None}
+    course_content_json = [item for item in course_content_json if item['parent_folder_id'] in root_folder_ids]
+    item_deletion_urls = ['%s/folders/%d' % (API_ROOT, item['id']) for item in course_content_json]
+    report_deletions('top-level folder', course_content_json, item_deletion_urls,
+                     delete_concurrently(item_deletion_urls, params={'force': 'true'}))  # note: must be a string
 
     course_content_path = '%s/files' % COURSE_URL
-    course_content_response = Utils.canvas_multi_page_request(course_content_path, type_hint='course files')
-    if not course_content_response:
+    course_content_json = Utils.canvas_multi_page_request(course_content_path, type_hint='course files')
+    if course_content_json is None:
         print('ERROR: unable to retrieve course files list; aborting')
         sys.exit()
-    course_content_json = json.loads(course_content_response)
 
-    for item in course_content_json:
-        item_deletion_url = '%s/files/%d' % (course_content_path.split('/courses')[0], item['id'])
-        item_deletion_response = requests.delete(item_deletion_url, headers=Utils.canvas_api_headers())
-        if item_deletion_response.status_code == 200:
-            print('\tDeleted file at %s:' % item_deletion_url, item)
-        else:
-            print('\tWARNING: unable to delete file at %s:' % item_deletion_url, item_deletion_response.text, '-', item)
-    print('Deleted', len(course_content_json), 'files')
+    item_deletion_urls = ['%s/files/%d' % (API_ROOT, item['id']) for item in course_content_json]
+    report_deletions('file', course_content_json, item_deletion_urls, delete_concurrently(item_deletion_urls))
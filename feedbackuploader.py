@@ -5,16 +5,13 @@ lets you upload a set of attachments, feedback comments and marks in bulk."""
 __author__ = 'Simon Robinson'
 __copyright__ = 'Copyright (c) 2024 Simon Robinson'
 __license__ = 'Apache 2.0'
-__version__ = '2024-03-14'  # ISO 8601 (YYYY-MM-DD)
+__version__ = '2026-10-15'  # ISO 8601 (YYYY-MM-DD)
 
 import argparse
-import json
 import mimetypes
 import os
 import sys
 
-import requests
-
 from canvashelpers import Args, Config, Utils
 
 DEFAULT_COMMENT = 'See attached file'
@@ -108,7 +105,7 @@ if args.marks_file:
         print('Ignoring marks file argument', args.marks_file, '- empty or not found in assignment directory at',
               marks_file)
 
-assignment_details_response = requests.get(ASSIGNMENT_URL, headers=Utils.canvas_api_headers())
+assignment_details_response = Utils.SESSION.get(ASSIGNMENT_URL)
 if assignment_details_response.status_code != 200:
     print('ERROR: unable to get assignment details - did you set a valid Canvas API token in %s?' % Config.FILE_PATH)
     sys.exit()
@@ -122,19 +119,20 @@ for mark_row in marks_map:
 if mark_exceeded:
     sys.exit()
 
-submission_list_response = Utils.get_assignment_submissions(ASSIGNMENT_URL, includes=['submission_comments'])
-if not submission_list_response:
+# the submission list and the course enrolments (used to identify the inbuilt test student) are loaded simultaneously
+submission_list_json, course_enrolment_json = Utils.run_concurrently(
+    lambda: Utils.get_assignment_submissions(ASSIGNMENT_URL, includes=['submission_comments']),
+    lambda: Utils.get_course_enrolments(ASSIGNMENT_URL.split('/assignments')[0]))
+if submission_list_json is None:
     print('ERROR: unable to retrieve submission list; aborting')
     sys.exit()
 
 # identify and ignore the inbuilt test student
-course_enrolment_response = Utils.get_course_enrolments(ASSIGNMENT_URL.split('/assignments')[0])
-if not course_enrolment_response:
+if course_enrolment_json is None:
     print('ERROR: unable to retrieve course enrolment list; aborting')
     sys.exit()
-ignored_users = [user['user_id'] for user in json.loads(course_enrolment_response)]
+ignored_users = [user['user_id'] for user in course_enrolment_json]
 
-submission_list_json = json.loads(submission_list_response)
 filtered_submission_list = Utils.filter_assignment_submissions(ASSIGNMENT_URL, submission_list_json,
                                                                groups_mode=args.groups and not args.groups_individual,
                                                                include_unsubmitted=args.include_unsubmitted,
@@ -161,7 +159,7 @@ if args.delete_existing:
 
                 comment_deletion_url = '%s/submissions/%d/comments/%d' % (
                     ASSIGNMENT_URL, submission['user_id'], comment['id'])
-                comment_deletion_response = requests.delete(comment_deletion_url, headers=Utils.canvas_api_headers())
+                comment_deletion_response = Utils.SESSION.delete(comment_deletion_url)
                 if comment_deletion_response.status_code == 200:
                     print('\tDeleted existing submission comment:', comment)
                 else:
@@ -261,8 +259,8 @@ for submission in filtered_submission_list:
     if attachment_file:
         # if there is an attachment we first need to request an upload URL, then associate with a submission comment
         submission_form_data = {'name': attachment_file, 'content_type': attachment_mime_type}
-        file_submission_url_response = requests.post('%s/comments/files' % user_submission_url,
-                                                     data=submission_form_data, headers=Utils.canvas_api_headers())
+        file_submission_url_response = Utils.SESSION.post('%s/comments/files' % user_submission_url,
+                                                          data=submission_form_data)
         if file_submission_url_response.status_code != 200:
             print('\tERROR: unable to retrieve attachment upload URL; skipping submission')
             continue
@@ -271,9 +269,8 @@ for submission in filtered_submission_list:
         print('\tUploading feedback attachment to', file_submission_url_json['upload_url'].split('?')[0], '[truncated]')
 
         files_data = {'file': (attachment_file, open(attachment_path, 'rb'))}
-        file_submission_upload_response = requests.post(file_submission_url_json['upload_url'],
-                                                        data=submission_form_data, files=files_data,
-                                                        headers=Utils.canvas_api_headers())
+        file_submission_upload_response = Utils.SESSION.post(file_submission_url_json['upload_url'],
+                                                             data=submission_form_data, files=files_data)
 
         if file_submission_upload_response.status_code != 201:  # note: 201 Created
             print('\tERROR: unable to upload attachment file; skipping submission')
@@ -283,8 +280,7 @@ for submission in filtered_submission_list:
         print('\tAssociating uploaded file', file_submission_upload_json['id'], 'with new attachment comment')
         comment_association_data['comment[file_ids][]'] = [file_submission_upload_json['id']]
 
-    comment_association_response = requests.put(user_submission_url, data=comment_association_data,
-                                                headers=Utils.canvas_api_headers())
+    comment_association_response = Utils.SESSION.put(user_submission_url, data=comment_association_data)
     if comment_association_response.status_code != 200:
         print('\tERROR: unable to add assignment mark/comment and associate attachment; skipping submission')
         continue
@@ -25,16 +25,14 @@ Related tools:
 __author__ = 'Simon Robinson'
 __copyright__ = 'Copyright (c) 2024 Simon Robinson'
 __license__ = 'Apache 2.0'
-__version__ = '2023-08-03'  # ISO 8601 (YYYY-MM-DD)
+__version__ = '2026-10-15'  # ISO 8601 (YYYY-MM-DD)
 
 import argparse
-import json
 import os
 import sys
 
 import openpyxl.utils
 import openpyxl.worksheet.dimensions
-import requests
 
 from canvashelpers import Args, Config, Utils
 
@@ -102,7 +100,7 @@ print('Running moderation manager as %s (%d) with moderator marking: %r' % (user
 user_map = {USER_ID: user_name}  # for use in backup file and log messages
 
 # 1) get any associated rubric via the assignment details - if present we need rubric details before anything else
-assignment_details_response = requests.get(ASSIGNMENT_URL, headers=Utils.canvas_api_headers())
+assignment_details_response = Utils.SESSION.get(ASSIGNMENT_URL)
 if assignment_details_response.status_code != 200:
     print('ERROR: unable to get assignment details - did you set a valid Canvas API token in %s?' % Config.FILE_PATH)
     sys.exit()
@@ -122,9 +120,8 @@ if HAS_RUBRIC:
     rubric_id = assignment_details_json['rubric_settings']['id']
     print('Found rubric', rubric_id, 'associated with assignment', ASSIGNMENT_ID)
 
-    rubric_associations_response = requests.get('%s/rubrics/%d' % (API_ROOT, rubric_id),
-                                                params={'include[]': ['assignment_associations']},
-                                                headers=Utils.canvas_api_headers())
+    rubric_associations_response = Utils.SESSION.get('%s/rubrics/%d' % (API_ROOT, rubric_id),
+                                                     params={'include[]': ['assignment_associations']})
     if rubric_associations_response.status_code != 200:
         print('ERROR: unable to get rubric', rubric_id, 'details; aborting')
         sys.exit()
@@ -170,20 +167,21 @@ for column in rubric_spreadsheet_map.values():
     spreadsheet.merge_cells(start_row=header_row, end_row=header_row, start_column=column - 1, end_column=column)
 
 # next, load the assignment's submissions as normal, but combine and average existing comments/scores
-submission_list_response = Utils.get_assignment_submissions(ASSIGNMENT_URL,
-                                                            includes=['provisional_grades', 'rubric_assessment'])
-if not submission_list_response:
+# (the course enrolments, used to identify the inbuilt test student, are loaded at the same time)
+submission_list_json, course_enrolment_json = Utils.run_concurrently(
+    lambda: Utils.get_assignment_submissions(ASSIGNMENT_URL, includes=['provisional_grades', 'rubric_assessment']),
+    lambda: Utils.get_course_enrolments(API_ROOT))
+if submission_list_json is None:
     print('ERROR: unable to retrieve submission list; aborting')
     sys.exit()
 
 # identify and ignore the inbuilt test student
-course_enrolment_response = Utils.get_course_enrolments(API_ROOT)
-if not course_enrolment_response:
+if course_enrolment_json is None:
     print('ERROR: unable to retrieve course enrolment list; aborting')
     sys.exit()
-ignored_users = [user['user_id'] for user in json.loads(course_enrolment_response)]
+ignored_users = [user['user_id'] for user in course_enrolment_json]
 
-submission_list_json = json.loads(submission_list_response)  # note: groups mode cannot be used when enabling moderation
+# note: groups mode cannot be used when enabling moderation
 filtered_submission_list = Utils.filter_assignment_submissions(ASSIGNMENT_URL, submission_list_json,
                                                                include_unsubmitted=args.include_unsubmitted,
                                                                ignored_users=ignored_users, sort_entries=True)
@@ -366,14 +364,13 @@ for submission in filtered_submission_list:
         rubric_link = '%s/rubric_associations/%d/rubric_assessments' % (API_ROOT, rubric_association['id'])
         if final_grade_id > -1:
             print('\tUpdating existing rubric assessment:', final_grade_id)
-            rubric_method = requests.put
+            rubric_method = Utils.SESSION.put
             rubric_link = '%s/%d' % (rubric_link, final_grade_id)
         else:
             print('\tCreating new rubric assessment')
-            rubric_method = requests.post
+            rubric_method = Utils.SESSION.post
 
-        create_rubric_response = rubric_method(rubric_link, data=new_provisional_grade_data,
-                                               headers=Utils.canvas_api_headers())
+        create_rubric_response = rubric_method(rubric_link, data=new_provisional_grade_data)
         if create_rubric_response.status_code != 200:
             print('\t\tERROR: rubric creation/update failed; skipping', create_rubric_response.text)
             skipped_submissions.add(submitter['student_name'])
@@ -381,8 +378,8 @@ for submission in filtered_submission_list:
         final_grade_id = create_rubric_response.json()['artifact']['provisional_grade_id']  # update if newly created
 
         print('\tSelecting final provisional grade rubric assessment:', final_grade_id)
-        provisional_grade_selection_response = requests.put('%s/provisional_grades/%d/select' % (
-            ASSIGNMENT_URL, final_grade_id), headers=Utils.canvas_api_headers())
+        provisional_grade_selection_response = Utils.SESSION.put(
+            '%s/provisional_grades/%d/select' % (ASSIGNMENT_URL, final_grade_id))
         if provisional_grade_selection_response.status_code != 200:
             print('\t\tERROR: unable to select final provisional grade for submission; aborting. Please make sure',
                   'this tool is being run as the assignment moderator')
@@ -408,8 +405,8 @@ grades_released_message = 'Assignment grades have already been published'  # Can
 first_student = {
     'student_id': Utils.get_submitter_details(ASSIGNMENT_URL, next(iter(filtered_submission_list)))['canvas_user_id']
 }
-provisional_grade_selection_response = requests.get('%s/provisional_grades/status' % ASSIGNMENT_URL,
-                                                    data=first_student, headers=Utils.canvas_api_headers())
+provisional_grade_selection_response = Utils.SESSION.get('%s/provisional_grades/status' % ASSIGNMENT_URL,
+                                                         data=first_student)
 if provisional_grade_selection_response.status_code == 400 and \
         provisional_grade_selection_response.json()['message'] == grades_released_message:
     grades_released = True
@@ -424,8 +421,7 @@ if skipped_submissions and not grades_released:
     sys.exit()
 
 if not grades_released:
-    post_grades_response = requests.post('%s/provisional_grades/publish' % ASSIGNMENT_URL,
-                                         headers=Utils.canvas_api_headers())
+    post_grades_response = Utils.SESSION.post('%s/provisional_grades/publish' % ASSIGNMENT_URL)
     if post_grades_response.status_code != 200:
         if post_grades_response.status_code == 400 and \
                 post_grades_response.json()['message'] == grades_released_message:
@@ -453,7 +449,7 @@ for submission in filtered_submission_list:
     if HAS_RUBRIC:
         final_grade_data['comment[text_comment]'] = score_feedback_hint
     user_submission_url = '%s/submissions/%d' % (ASSIGNMENT_URL, submitter['canvas_user_id'])
-    final_grade_response = requests.put(user_submission_url, data=final_grade_data, headers=Utils.canvas_api_headers())
+    final_grade_response = Utils.SESSION.put(user_submission_url, data=final_grade_data)
     if final_grade_response.status_code != 200:
         print('\t%s' % final_grade_response.text)
         print('\tERROR: unable to finalise assignment mark/comment; skipping submission from', submitter)
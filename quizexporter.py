@@ -8,10 +8,9 @@ limitation, exporting all responses to a single spreadsheet."""
 __author__ = 'Simon Robinson'
 __copyright__ = 'Copyright (c) 2024 Simon Robinson'
 __license__ = 'Apache 2.0'
-__version__ = '2024-04-17'  # ISO 8601 (YYYY-MM-DD)
+__version__ = '2026-10-15'  # ISO 8601 (YYYY-MM-DD)
 
 import argparse
-import json
 import os
 import re
 import sys
@@ -70,12 +69,11 @@ spreadsheet_headers = ['Student number', 'Student name']
 spreadsheet_headers_set = False
 spreadsheet_row = 2  # 1-indexed; row 1 = headers
 
-submission_list_response = Utils.get_assignment_submissions(ASSIGNMENT_URL)
-if not submission_list_response:
+submission_list_json = Utils.get_assignment_submissions(ASSIGNMENT_URL)
+if submission_list_json is None:
     print('ERROR: unable to retrieve submission list - did you set a valid Canvas API token in %s?' % Config.FILE_PATH)
     sys.exit()
 
-submission_list_json = json.loads(submission_list_response)
 user_session_ids = []
 for submission in submission_list_json:
     if 'external_tool_url' in submission:
@@ -138,13 +136,13 @@ for user_session_id in user_session_ids:
     # then the actual quiz questions
     quiz_questions_response = requests.get('%s/quiz_sessions/%d/session_items' % (QUIZ_API_ROOT, quiz_session_id),
                                            headers=quiz_session_headers)
-    quiz_questions_json = quiz_questions_response.json()
+    quiz_questions_json = Utils.response_json(quiz_questions_response)
 
     # and finally the responses that were submitted
     quiz_answers_response = requests.get(
         '%s/quiz_sessions/%d/results/%s/session_item_results' % (QUIZ_API_ROOT, quiz_session_id, results_id),
         headers=quiz_session_headers)
-    quiz_answers_json = quiz_answers_response.json()
+    quiz_answers_json = Utils.response_json(quiz_answers_response)
 
     current_column = 3  # in our spreadsheet, column 1 is always the student's number; column 2 is always their name
     for question in quiz_questions_json:
@@ -7,14 +7,11 @@ any existing data lost*) if it is present."""
 __author__ = 'Simon Robinson'
 __copyright__ = 'Copyright (c) 2024 Simon Robinson'
 __license__ = 'Apache 2.0'
-__version__ = '2024-02-20'  # ISO 8601 (YYYY-MM-DD)
+__version__ = '2026-10-15'  # ISO 8601 (YYYY-MM-DD)
 
 import argparse
-import json
 import sys
 
-import requests
-
 from canvashelpers import Args, Utils
 
 
@@ -43,7 +40,7 @@ print('%sreating identifier column for course %s' % ('DRY RUN: c' if args.dry_ru
 # example: {'title': 'Notes', 'position': 1, 'teacher_notes': True, 'read_only': False, 'id': 100, 'hidden': False}
 # https://canvas.instructure.com/doc/api/custom_gradebook_columns.html#method.custom_gradebook_columns_api.create
 existing_private_column_id = -1
-custom_column_response = requests.get('%s/custom_gradebook_columns' % COURSE_URL, headers=Utils.canvas_api_headers())
+custom_column_response = Utils.SESSION.get('%s/custom_gradebook_columns' % COURSE_URL)
 if custom_column_response.status_code == 200:
     existing_custom_columns = custom_column_response.json()
     for column in existing_custom_columns:
@@ -69,12 +66,11 @@ else:
     }
 
     column_request_url = '%s/custom_gradebook_columns/' % COURSE_URL
-    request_type = requests.post
+    request_type = Utils.SESSION.post
     if existing_private_column_id >= 0:
         column_request_url += str(existing_private_column_id)
-        request_type = requests.put
-    custom_column_request_response = request_type(column_request_url, data=new_column_data,
-                                                  headers=Utils.canvas_api_headers())
+        request_type = Utils.SESSION.put
+    custom_column_request_response = request_type(column_request_url, data=new_column_data)
     if custom_column_request_response.status_code != 200:
         print('\tERROR: unable to create/update custom column; aborting')
         sys.exit()
@@ -84,13 +80,11 @@ else:
         'updated' if existing_private_column_id >= 0 else 'created', custom_column_id))
 
 # only users with a 'student' enrolment are part of a course's Gradebook
-course_user_response = Utils.get_course_users(COURSE_URL, enrolment_types=['student'])
-if not course_user_response:
+course_user_json = Utils.get_course_users(COURSE_URL, enrolment_types=['student'])
+if course_user_json is None:
     print('ERROR: unable to retrieve course student list; aborting')
     sys.exit()
 
-course_user_json = json.loads(course_user_response)
-
 
 # add a group number where requested - separated for easier format customisation
 def get_column_content(user_identifier):
@@ -119,8 +113,8 @@ if not args.individual_upload:
         print('DRY RUN: would bulk upload', len(column_user_data), 'records')
         sys.exit()
 
-    column_data_response = requests.put('%s/custom_gradebook_column_data' % COURSE_URL,
-                                        json={'column_data': column_user_data}, headers=Utils.canvas_api_headers())
+    column_data_response = Utils.SESSION.put('%s/custom_gradebook_column_data' % COURSE_URL,
+                                             json={'column_data': column_user_data})
 
     if column_data_response.status_code != 200:
         print(column_data_response.text)
@@ -143,9 +137,9 @@ for user in course_user_json:
             print('DRY RUN: would set column', custom_column_id, 'for user', user['id'], 'to', column_content)
             continue
 
-        column_data_response = requests.put(
+        column_data_response = Utils.SESSION.put(
             '%s/custom_gradebook_columns/%d/data/%d' % (COURSE_URL, custom_column_id, user['id']),
-            data={'column_data[content]': column_content}, headers=Utils.canvas_api_headers())
+            data={'column_data[content]': column_content})
 
         if column_data_response.status_code != 200:
             print('ERROR: unable to save custom column user data: ', column_data_response.text, '- skipping', user)
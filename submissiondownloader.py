@@ -5,14 +5,12 @@ institutional student number) or group name."""
 __author__ = 'Simon Robinson'
 __copyright__ = 'Copyright (c) 2024 Simon Robinson'
 __license__ = 'Apache 2.0'
-__version__ = '2023-10-04'  # ISO 8601 (YYYY-MM-DD)
+__version__ = '2026-10-15'  # ISO 8601 (YYYY-MM-DD)
 
 import argparse
 import concurrent.futures
 import csv
 import datetime
-import functools
-import json
 import os
 import re
 import sys
@@ -73,7 +71,7 @@ if os.path.exists(OUTPUT_DIRECTORY):
     sys.exit()
 os.mkdir(OUTPUT_DIRECTORY)
 
-assignment_details_response = requests.get(ASSIGNMENT_URL, headers=Utils.canvas_api_headers())
+assignment_details_response = Utils.SESSION.get(ASSIGNMENT_URL)
 if assignment_details_response.status_code != 200:
     print('ERROR: unable to get assignment details - did you set a valid Canvas API token in %s?' % Config.FILE_PATH)
     sys.exit()
@@ -93,24 +91,26 @@ else:
         output_format = '[group name]/[original uploaded filename]'
     print('Downloading all submission documents from', args.url[0], 'named as', output_format, 'to', OUTPUT_DIRECTORY)
 
-submission_list_response = Utils.get_assignment_submissions(ASSIGNMENT_URL)
-if not submission_list_response:
+submission_list_json = Utils.get_assignment_submissions(ASSIGNMENT_URL)
+if submission_list_json is None:
     print('ERROR: unable to retrieve submission list - did you set a valid Canvas API token in %s?' % Config.FILE_PATH)
     sys.exit()
 
-submission_list_json = json.loads(submission_list_response)
 filtered_submission_list = Utils.filter_assignment_submissions(ASSIGNMENT_URL, submission_list_json,
                                                                groups_mode=GROUP_ASSIGNMENT, sort_entries=True)
 
+# submitter details are used both when filtering by name and when saving, so are looked up just once per submission
+submitter_list = [(submission, Utils.get_submitter_details(ASSIGNMENT_URL, submission, groups_mode=GROUP_ASSIGNMENT))
+                  for submission in filtered_submission_list]
 
-def compare_attachment_dates(a1, a2):
-    a1_created = int(datetime.datetime.fromisoformat(a1['created_at'].replace('Z', '+00:00')).timestamp())
-    a2_created = int(datetime.datetime.fromisoformat(a2['created_at'].replace('Z', '+00:00')).timestamp())
-    return a2_created - a1_created  # sort in descending order of creation date
 
+def get_attachment_date(attachment):
+    # used as a sort key, so each attachment's date is parsed only once (rather than in every comparison)
+    return int(datetime.datetime.fromisoformat(attachment['created_at'].replace('Z', '+00:00')).timestamp())
 
-def filter_matched_submissions(single_submission):
-    submitter_details = Utils.get_submitter_details(ASSIGNMENT_URL, single_submission, groups_mode=GROUP_ASSIGNMENT)
+
+def filter_matched_submissions(submission_and_submitter):
+    submitter_details = submission_and_submitter[1]
     if GROUP_ASSIGNMENT:
         return submitter_matcher.match(submitter_details['group_name'])
     return submitter_matcher.match(submitter_details['student_number']) or submitter_matcher.match(
@@ -127,10 +127,10 @@ def get_turnitin_id(single_submission):
 submitter_matcher = None
 if args.submitter_pattern:
     submitter_matcher = re.compile(args.submitter_pattern, flags=re.IGNORECASE)
-    matched_submissions = list(filter(filter_matched_submissions, filtered_submission_list))
-    print('Filtered', len(filtered_submission_list), 'valid submissions using pattern "%s"' % args.submitter_pattern,
+    matched_submissions = list(filter(filter_matched_submissions, submitter_list))
+    print('Filtered', len(submitter_list), 'valid submissions using pattern "%s"' % args.submitter_pattern,
           '-', len(matched_submissions), 'valid submissions remaining')
-    filtered_submission_list = matched_submissions
+    submitter_list = matched_submissions
 
 turnitin_links_present = False
 turnitin_report_downloads = {}
@@ -139,10 +139,9 @@ if args.turnitin_pdf_session_id:
     turnitin_session_cookie = {'cookie': 'session-id=%s' % args.turnitin_pdf_session_id}
 
 download_count = 0
-download_total = len(filtered_submission_list)
-for submission in filtered_submission_list:
+download_total = len(submitter_list)
+for submission, submitter in submitter_list:
     download_count += 1
-    submitter = Utils.get_submitter_details(ASSIGNMENT_URL, submission, groups_mode=GROUP_ASSIGNMENT)
     if not submitter:
         print('ERROR: submitter details not found for submission; skipping:', submission)
         continue
@@ -198,7 +197,7 @@ for submission in filtered_submission_list:
             os.mkdir(submission_output_directory)
 
         submission_documents = submission['attachments']
-        submission_documents.sort(key=functools.cmp_to_key(compare_attachment_dates))  # newest attachment is now first
+        submission_documents.sort(key=get_attachment_date, reverse=True)  # newest attachment is now first
         for document in submission_documents:
             file_download_response = requests.get(document['url'])
             if file_download_response.status_code == 200:
@@ -31,12 +31,11 @@ Example usage:
 __author__ = 'Simon Robinson'
 __copyright__ = 'Copyright (c) 2024 Simon Robinson'
 __license__ = 'Apache 2.0'
-__version__ = '2024-05-13'  # ISO 8601 (YYYY-MM-DD)
+__version__ = '2026-10-15'  # ISO 8601 (YYYY-MM-DD)
 
 import argparse
 import contextlib
 import datetime
-import json
 import math
 import os
 import random
@@ -263,8 +262,7 @@ class GroupResponseProcessor:
                 current_quiz_id = -1
                 current_quiz_assignment_id = -1
             else:
-                quiz_creation_response = requests.post('%s/quizzes' % COURSE_URL,
-                                                       data=quiz_configuration, headers=Utils.canvas_api_headers())
+                quiz_creation_response = Utils.SESSION.post('%s/quizzes' % COURSE_URL, data=quiz_configuration)
                 if quiz_creation_response.status_code != 200:
                     print('\tERROR: unable to create quiz for group', group_key, ':', quiz_creation_response.text,
                           '- aborting')
@@ -296,9 +294,8 @@ class GroupResponseProcessor:
                     print('\tDRY RUN: skipping creation of new quiz question:',
                           quiz_question_configuration['question[question_name]'])
                 else:
-                    quiz_question_response = requests.post('%s/quizzes/%s/questions' % (COURSE_URL, current_quiz_id),
-                                                           data=quiz_question_configuration,
-                                                           headers=Utils.canvas_api_headers())
+                    quiz_question_response = Utils.SESSION.post(
+                        '%s/quizzes/%s/questions' % (COURSE_URL, current_quiz_id), data=quiz_question_configuration)
                     if quiz_question_response.status_code != 200:
                         print('\tERROR: unable to create question',
                               quiz_question_configuration['question[question_name]'],
@@ -319,9 +316,8 @@ class GroupResponseProcessor:
                 print('\tDRY RUN: skipping creation of general comments quiz question:',
                       quiz_question_configuration['question[question_name]'])
             else:
-                quiz_question_response = requests.post('%s/quizzes/%s/questions' % (COURSE_URL, current_quiz_id),
-                                                       data=quiz_question_configuration,
-                                                       headers=Utils.canvas_api_headers())
+                quiz_question_response = Utils.SESSION.post(
+                    '%s/quizzes/%s/questions' % (COURSE_URL, current_quiz_id), data=quiz_question_configuration)
                 if quiz_question_response.status_code != 200:
                     print('\tERROR: unable to create general comments question',
                           quiz_question_configuration['question[question_name]'], 'for quiz:',
@@ -336,8 +332,8 @@ class GroupResponseProcessor:
             if args.dry_run:
                 print('\tDRY RUN: skipping update push for quiz', quiz_configuration['quiz[title]'])
             else:
-                quiz_update_response = requests.put('%s/quizzes/%s' % (COURSE_URL, current_quiz_id),
-                                                    data=quiz_configuration, headers=Utils.canvas_api_headers())
+                quiz_update_response = Utils.SESSION.put('%s/quizzes/%s' % (COURSE_URL, current_quiz_id),
+                                                         data=quiz_configuration)
                 if quiz_update_response.status_code != 200:
                     print('\tERROR: unable to update quiz', quiz_configuration['quiz[title]'], ':',
                           quiz_update_response.text, '- aborting')
@@ -352,8 +348,8 @@ class GroupResponseProcessor:
             if args.dry_run:
                 print('\tDRY RUN: skipping gradebook configuration for quiz', quiz_configuration['quiz[title]'])
             else:
-                quiz_update_response = requests.put('%s/assignments/%s' % (COURSE_URL, current_quiz_assignment_id),
-                                                    data=assignment_configuration, headers=Utils.canvas_api_headers())
+                quiz_update_response = Utils.SESSION.put(
+                    '%s/assignments/%s' % (COURSE_URL, current_quiz_assignment_id), data=assignment_configuration)
                 if quiz_update_response.status_code != 200:
                     print('\tERROR: unable to update gradebook configuration for quiz',
                           quiz_configuration['quiz[title]'], ':', quiz_update_response.text, '- aborting')
@@ -416,8 +412,8 @@ class GroupResponseProcessor:
                 print('\tDRY RUN: skipping creation of new quiz:', quiz_configuration['quiz[title]'])
                 current_quiz_id = -1
             else:
-                quiz_creation_response = requests.post('%s/quizzes' % GroupResponseProcessor.new_quiz_api(COURSE_URL),
-                                                       data=quiz_configuration, headers=Utils.canvas_api_headers())
+                quiz_creation_response = Utils.SESSION.post(
+                    '%s/quizzes' % GroupResponseProcessor.new_quiz_api(COURSE_URL), data=quiz_configuration)
                 if quiz_creation_response.status_code != 200:
                     print('\tERROR: unable to create new quiz for group', group_key, ':', quiz_creation_response.text,
                           '- aborting')
@@ -464,9 +460,9 @@ class GroupResponseProcessor:
                     print('\tDRY RUN: skipping creation of new quiz question:',
                           quiz_question_configuration['item']['entry']['title'])
                 else:
-                    quiz_question_response = requests.post(
+                    quiz_question_response = Utils.SESSION.post(
                         '%s/quizzes/%s/items' % (GroupResponseProcessor.new_quiz_api(COURSE_URL), current_quiz_id),
-                        json=quiz_question_configuration, headers=Utils.canvas_api_headers())
+                        json=quiz_question_configuration)
                     if quiz_question_response.status_code != 200:
                         print('\tERROR: unable to create question',
                               quiz_question_configuration['item']['entry']['title'], 'for quiz:',
@@ -491,10 +487,9 @@ class GroupResponseProcessor:
                 print('\tDRY RUN: skipping creation of general comments new quiz question:',
                       quiz_question_configuration['item[entry][title]'])
             else:
-                quiz_question_response = requests.post(
+                quiz_question_response = Utils.SESSION.post(
                     '%s/quizzes/%s/items' % (GroupResponseProcessor.new_quiz_api(COURSE_URL), current_quiz_id),
-                    data=quiz_question_configuration,
-                    headers=Utils.canvas_api_headers())
+                    data=quiz_question_configuration)
                 if quiz_question_response.status_code != 200:
                     print('\tERROR: unable to create general comments question',
                           quiz_question_configuration['item[entry][title]'], 'for quiz:',
@@ -513,8 +508,8 @@ class GroupResponseProcessor:
             if args.dry_run:
                 print('\tDRY RUN: skipping update push for new quiz', quiz_configuration['quiz[title]'])
             else:
-                quiz_update_response = requests.put('%s/assignments/%s' % (COURSE_URL, current_quiz_id),
-                                                    data=assignment_configuration, headers=Utils.canvas_api_headers())
+                quiz_update_response = Utils.SESSION.put('%s/assignments/%s' % (COURSE_URL, current_quiz_id),
+                                                         data=assignment_configuration)
                 if quiz_update_response.status_code != 200:
                     print('\tERROR: unable to update new quiz', quiz_configuration['quiz[title]'], ':',
                           quiz_update_response.text, '- aborting')
@@ -559,9 +554,9 @@ class GroupResponseProcessor:
                   current_group_canvas_ids, 'available from', args.setup_quiz_available_from, 'and due at',
                   args.setup_quiz_due_at)
         else:
-            access_override_response = requests.post(
+            access_override_response = Utils.SESSION.post(
                 '%s/assignments/%s/overrides' % (COURSE_URL, current_quiz_id),
-                data=access_override_configuration, headers=Utils.canvas_api_headers())
+                data=access_override_configuration)
             if access_override_response.status_code != 201:  # note 201 Created not 200 OK
                 print('\tERROR: unable to configure quiz assignment access for Canvas users', current_group_canvas_ids,
                       ':', access_override_response.text, '- aborting')
@@ -570,21 +565,18 @@ class GroupResponseProcessor:
 
     @staticmethod
     def get_assignment_group_id(group_name):
-        assignment_group_response = Utils.canvas_multi_page_request('%s/assignment_groups' % COURSE_URL,
-                                                                    type_hint='assignment groups')
-        if not assignment_group_response:
+        assignment_group_response_json = Utils.canvas_multi_page_request('%s/assignment_groups' % COURSE_URL,
+                                                                         type_hint='assignment groups')
+        if assignment_group_response_json is None:
             return None
 
-        assignment_group_response_json = json.loads(assignment_group_response)
         for group_properties in assignment_group_response_json:
             if group_properties['name'] == group_name:
                 return group_properties['id']
 
     @staticmethod
     def create_assignment_group(new_group_name):
-        group_creation_response = requests.post('%s/assignment_groups' % COURSE_URL,
-                                                data={'name': new_group_name},
-                                                headers=Utils.canvas_api_headers())
+        group_creation_response = Utils.SESSION.post('%s/assignment_groups' % COURSE_URL, data={'name': new_group_name})
         if group_creation_response.status_code != 200:
             print('\tERROR: unable to create assignment group; aborting')
             sys.exit()
@@ -711,13 +703,12 @@ class GroupResponseProcessor:
             print('ERROR: unable to find quiz group name', quiz_group_name, '- aborting')
             sys.exit()
 
-        assignment_list_response = Utils.canvas_multi_page_request(
+        assignment_list_response_json = Utils.canvas_multi_page_request(
             '%s/assignment_groups/%s/assignments' % (COURSE_URL, assignment_group_id), type_hint='assignment list')
-        if not assignment_list_response:
+        if assignment_list_response_json is None:
             print('\tERROR: unable to get assignment list response; aborting')
             sys.exit()
 
-        assignment_list_response_json = json.loads(assignment_list_response)
         for quiz in assignment_list_response_json:
             if 'quiz_id' not in quiz:
                 # avoid having to specify quiz type for analysis by detecting the type of the first submission
@@ -735,14 +726,13 @@ class GroupResponseProcessor:
 
             # then all quiz questions
             question_student_map = {}
-            quiz_question_response = requests.get('%s/quizzes/%s/questions' % (COURSE_URL, quiz_id),
-                                                  headers=Utils.canvas_api_headers())
+            quiz_question_response = Utils.SESSION.get('%s/quizzes/%s/questions' % (COURSE_URL, quiz_id))
             if quiz_question_response.status_code != 200:
                 print('\tERROR: unable to get quiz questions for quiz', quiz_id, '- aborting:',
                       quiz_question_response.text)
                 sys.exit()
 
-            quiz_question_response_json = quiz_question_response.json()
+            quiz_question_response_json = Utils.response_json(quiz_question_response)
             print('\tFound', end=' ')
             for question in quiz_question_response_json:
                 question_id = question['id']
@@ -756,14 +746,13 @@ class GroupResponseProcessor:
             print()
 
             # then all submissions for that quiz
-            quiz_submission_response = requests.get('%s/quizzes/%s/submissions' % (COURSE_URL, quiz_id),
-                                                    headers=Utils.canvas_api_headers())
+            quiz_submission_response = Utils.SESSION.get('%s/quizzes/%s/submissions' % (COURSE_URL, quiz_id))
             if quiz_submission_response.status_code != 200:
                 print('\tERROR: unable to get quiz submissions for quiz', quiz_id, '- aborting:',
                       quiz_submission_response.text)
                 sys.exit()
 
-            quiz_submission_response_json = quiz_submission_response.json()
+            quiz_submission_response_json = Utils.response_json(quiz_submission_response)
             current_quiz_submission = quiz_submission_response_json['quiz_submissions']
             if len(current_quiz_submission) <= 0:
                 print('\tNo submissions found for quiz', quiz_id, '- skipping')
@@ -773,10 +762,9 @@ class GroupResponseProcessor:
                 print('\tLoading quiz', quiz_id, 'submission:', submission['id'])
 
                 # then a single submission's details
-                quiz_submission_individual_response = requests.get(
+                quiz_submission_individual_response = Utils.SESSION.get(
                     '%s/quizzes/%s/submissions/%s' % (COURSE_URL, quiz_id, submission['id']),
-                    params={'include[]': ['submission', 'quiz', 'user', 'submission_history']},
-                    headers=Utils.canvas_api_headers())
+                    params={'include[]': ['submission', 'quiz', 'user', 'submission_history']})
                 if quiz_submission_individual_response.status_code != 200:
                     print('\t\tERROR: unable to get individual quiz response', submission['id'], '- aborting:',
                           quiz_submission_individual_response.text)
@@ -925,12 +913,11 @@ class GroupResponseProcessor:
             assignment_url = Utils.course_url_to_api(quiz['html_url'])
             print('\tRequesting new quiz assignment submissions list from', assignment_url)
             with open(os.devnull, 'w') as f, contextlib.redirect_stdout(f):
-                submission_list_response = Utils.get_assignment_submissions(assignment_url)
-            if not submission_list_response:
+                submission_list_json = Utils.get_assignment_submissions(assignment_url)
+            if submission_list_json is None:
                 print('\tERROR: unable to retrieve new quiz assignment submission list')
                 sys.exit()
 
-            submission_list_json = json.loads(submission_list_response)
             user_session_map = []
             for submission_summary in submission_list_json:
                 if submission_summary['submission_type'] and 'external_tool_url' in submission_summary:
@@ -1027,7 +1014,7 @@ class GroupResponseProcessor:
                 quiz_questions_response = requests.get(
                     '%s/quiz_sessions/%d/session_items' % (quiz_api_root, quiz_session_id),
                     headers=quiz_session_headers)
-                quiz_question_response_json = quiz_questions_response.json()
+                quiz_question_response_json = Utils.response_json(quiz_questions_response)
                 print('\t\tFound', end=' ')
                 for question in quiz_question_response_json:
                     question_id = question['item']['id']
@@ -1048,7 +1035,7 @@ class GroupResponseProcessor:
                     '%s/quiz_sessions/%d/results/%s/session_item_results' % (
                         quiz_api_root, quiz_session_id, results_id),
                     headers=quiz_session_headers)
-                submission_answers = quiz_answers_response.json()
+                submission_answers = Utils.response_json(quiz_answers_response)
 
                 for answer in submission_answers:
                     if answer['item_id'] in question_student_map:
@@ -1136,14 +1123,13 @@ class GroupResponseProcessor:
             print('ERROR: unable to find quiz group name to delete:', quiz_group_name, '- aborting')
             sys.exit()
 
-        assignment_list_response = Utils.canvas_multi_page_request(
+        assignment_list_response_json = Utils.canvas_multi_page_request(
             '%s/assignment_groups/%s/assignments' % (COURSE_URL, assignment_group_id), type_hint='assignment list')
-        if not assignment_list_response:
+        if assignment_list_response_json is None:
             print('\tERROR: unable to get assignment list response for deletion; aborting')
             sys.exit()
 
         deletion_confirmed = False
-        assignment_list_response_json = json.loads(assignment_list_response)
         for quiz in assignment_list_response_json:
             if 'quiz_id' in quiz:
                 print('Found quiz ID', quiz['quiz_id'], '-', quiz['name'], 'with assignment ID', quiz['id'])
@@ -1166,7 +1152,7 @@ class GroupResponseProcessor:
                 continue
 
             quiz_deletion_url = '%s/assignments/%d' % (COURSE_URL, quiz['id'])
-            quiz_deletion_response = requests.delete(quiz_deletion_url, headers=Utils.canvas_api_headers())
+            quiz_deletion_response = Utils.SESSION.delete(quiz_deletion_url)
             if quiz_deletion_response.status_code == 200:
                 print('\tDeleted assignment at %s:' % quiz_deletion_url, quiz)
             else: